@@ -0,0 +1,321 @@
+import gzip
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from bookings import booking, free_periods
+from cache import cache, venue_key, artist_key
+import exporter
+from importer import FORMATS, IMPORTERS, import_upload
+from models import db, Show, Venue, Artist
+from queries import (
+    venue_areas,
+    artist_page,
+    show_page,
+    upcoming_show_counts,
+    venue_detail,
+    artist_detail,
+    venue_version,
+    artist_version,
+    delete_venues,
+    delete_artists,
+    bookings,
+    show_conflicts
+)
+from search import venue_search, artist_search
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+#----------------------------------------------------------------------------#
+# Responses.
+#----------------------------------------------------------------------------#
+
+# Bodies smaller than this are not worth compressing.
+GZIP_MIN_SIZE = 512
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError('%r is not JSON serializable' % (value,))
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_default, separators=(',', ':')).encode()
+
+
+def json_response(data):
+    """Serialize `data` as a JSON response with an ETag and optional gzip.
+
+    Clients presenting a matching If-None-Match get an empty 304. The
+    compressed representation gets its own ETag.
+    """
+    body = dumps(data)
+    etag = hashlib.sha1(body).hexdigest()
+    compress = 'gzip' in request.accept_encodings and len(body) >= GZIP_MIN_SIZE
+    if compress:
+        etag += '-gzip'
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        if compress:
+            body = gzip.compress(body, compresslevel=6)
+        response = Response(body, mimetype='application/json')
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+@api.errorhandler(405)
+def api_error(error):
+    return jsonify({"error": error.code, "message": error.description}), error.code
+
+#----------------------------------------------------------------------------#
+# Listings.
+#----------------------------------------------------------------------------#
+
+def _page(loader, key, **filters):
+    try:
+        data, next_cursor = loader(
+            after=request.args.get('after'),
+            limit=current_app.config['LISTING_PAGE_SIZE'],
+            **filters)
+    except ValueError:
+        abort(400, 'Malformed cursor')
+    return json_response({key: list(data), "next_cursor": next_cursor})
+
+
+@api.route('/venues')
+def venues():
+    return _page(venue_areas, 'areas', genre=request.args.get('genre'))
+
+
+@api.route('/artists')
+def artists():
+    return _page(artist_page, 'artists', genre=request.args.get('genre'))
+
+
+@api.route('/shows')
+def shows():
+    return _page(show_page, 'shows')
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+def _search(searcher, key):
+    results, count = searcher.search(
+        request.args.get('q', ''), current_app.config['SEARCH_RESULT_LIMIT'])
+    counts = upcoming_show_counts(key, [result.id for result in results])
+    return json_response({
+        "count": count,
+        "data": [{
+            "id": result.id,
+            "name": result.name,
+            "num_upcoming_shows": counts[result.id]
+        } for result in results]
+    })
+
+
+@api.route('/venues/search')
+def search_venues():
+    return _search(venue_search, Show.venue_id)
+
+
+@api.route('/artists/search')
+def search_artists():
+    return _search(artist_search, Show.artist_id)
+
+#----------------------------------------------------------------------------#
+# Detail.
+#----------------------------------------------------------------------------#
+
+def _detail(loader, version_loader, key, id):
+    limit = current_app.config['DETAIL_SHOWS_LIMIT']
+    past_after = request.args.get('past_after')
+    try:
+        if past_after:
+            data = loader(id, limit, past_after)
+        else:
+            # The version keeps the cached entry from outliving a change
+            # another process made or a show starting.
+            version = version_loader(id)
+            data = version and cache.get_or_set(key(id), lambda: loader(id, limit), version)
+    except ValueError:
+        abort(400, 'Malformed cursor')
+    if data is None:
+        abort(404)
+    return json_response(data)
+
+
+@api.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+    return _detail(venue_detail, venue_version, venue_key, venue_id)
+
+
+@api.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+    return _detail(artist_detail, artist_version, artist_key, artist_id)
+
+#----------------------------------------------------------------------------#
+# Availability.
+#----------------------------------------------------------------------------#
+
+def _time(name, default=None):
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, 'Malformed %s' % name)
+
+
+def _booking_data(show):
+    return {
+        "show_id": show.id,
+        "venue_id": show.venue_id,
+        "artist_id": show.artist_id,
+        "start_time": show.startTime,
+        "end_time": booking(show.startTime, show.duration).end
+    }
+
+
+def _availability(model, key, id):
+    if db.session.query(model.id).filter(model.id == id).first() is None:
+        abort(404)
+    start = _time('start', datetime.now().replace(microsecond=0))
+    end = _time('end', start + timedelta(days=7))
+    max_days = current_app.config['AVAILABILITY_MAX_DAYS']
+    if not start < end <= start + timedelta(days=max_days):
+        abort(400, 'end must follow start by at most %d days' % max_days)
+    shows = bookings(key, [id], start, end)
+    return json_response({
+        "start": start,
+        "end": end,
+        "booked": [_booking_data(show) for show in shows],
+        "free": [{"start": free_start, "end": free_end} for free_start, free_end in free_periods(
+            [booking(show.startTime, show.duration) for show in shows], start, end)]
+    })
+
+
+@api.route('/venues/<int:venue_id>/availability')
+def venue_availability(venue_id):
+    """Shows and free periods of a venue between `start` (default now) and `end` (a week later)."""
+    return _availability(Venue, Show.venue_id, venue_id)
+
+
+@api.route('/artists/<int:artist_id>/availability')
+def artist_availability(artist_id):
+    """Shows and free periods of an artist between `start` (default now) and `end` (a week later)."""
+    return _availability(Artist, Show.artist_id, artist_id)
+
+
+@api.route('/shows/conflicts')
+def check_show():
+    """Whether a show of `venue_id` and `artist_id` at `start_time` lasting `duration` minutes fits."""
+    venue_id = request.args.get('venue_id', type=int)
+    artist_id = request.args.get('artist_id', type=int)
+    start_time = _time('start_time')
+    duration = request.args.get('duration', current_app.config['SHOW_DEFAULT_DURATION'], type=int)
+    if venue_id is None or artist_id is None or start_time is None:
+        abort(400, 'venue_id, artist_id and start_time are required')
+    if not 0 < duration <= current_app.config['SHOW_MAX_DURATION']:
+        abort(400, 'duration must be between 1 and %d minutes' % current_app.config['SHOW_MAX_DURATION'])
+    conflicts = show_conflicts(venue_id, artist_id, start_time, duration)
+    return json_response({
+        "available": not conflicts,
+        "conflicts": [_booking_data(show) for show in conflicts]
+    })
+
+#----------------------------------------------------------------------------#
+# Import.
+#----------------------------------------------------------------------------#
+
+@api.route('/import/<kind>', methods=['POST'])
+def import_rows(kind):
+    """Import the CSV or JSON-lines file uploaded as `file`; see importer.py."""
+    file = request.files.get('file')
+    format = request.args.get('format')
+    if kind not in IMPORTERS:
+        abort(404)
+    if file is None:
+        abort(400, 'Missing file')
+    if format is not None and format not in FORMATS:
+        abort(400, 'Unknown format')
+    report = import_upload(kind, file, format)
+    status = 200 if not (report.rejected or report.failed) else 422
+    return jsonify(report.as_dict()), status
+
+#----------------------------------------------------------------------------#
+# Export.
+#----------------------------------------------------------------------------#
+
+@api.route('/export/<kind>')
+def export_rows(kind):
+    """Stream every venue, artist or show; see exporter.py.
+
+    `format` is csv (default), jsonl or parquet. `start_id` and `end_id`
+    restrict the export to an id range, so an interrupted download can be
+    resumed.
+    """
+    format = request.args.get('format', 'csv')
+    if kind not in exporter.EXPORTS:
+        abort(404)
+    if format not in exporter.FORMATS:
+        abort(400, 'Unknown format')
+    start_id = request.args.get('start_id', type=int)
+    end_id = request.args.get('end_id', type=int)
+    try:
+        chunks = exporter.export_stream(kind, format, start_id, end_id)
+    except RuntimeError as e:
+        abort(400, str(e))
+    response = Response(stream_with_context(chunks), mimetype=exporter.MIMETYPES[format])
+    response.headers['Content-Disposition'] = 'attachment; filename=%s.%s' % (kind, format)
+    return response
+
+#----------------------------------------------------------------------------#
+# Bulk deletion.
+#----------------------------------------------------------------------------#
+
+def _ids():
+    ids = (request.get_json(silent=True) or {}).get('ids')
+    if not isinstance(ids, list) or not all(isinstance(id, int) for id in ids):
+        abort(400, 'Expected {"ids": [...]}')
+    return ids
+
+
+@api.route('/venues/delete', methods=['POST'])
+def delete_venue_ids():
+    """Delete the venues listed in {"ids": [...]} with their shows."""
+    ids = _ids()
+    deleted, artist_ids = delete_venues(ids)
+    db.session.commit()
+    cache.delete(*map(venue_key, ids), *map(artist_key, artist_ids))
+    venue_search.invalidate()
+    return jsonify({"deleted": deleted})
+
+
+@api.route('/artists/delete', methods=['POST'])
+def delete_artist_ids():
+    """Delete the artists listed in {"ids": [...]} with their shows."""
+    ids = _ids()
+    deleted, venue_ids = delete_artists(ids)
+    db.session.commit()
+    cache.delete(*map(artist_key, ids), *map(venue_key, venue_ids))
+    artist_search.invalidate()
+    return jsonify({"deleted": deleted})
@@ -2,37 +2,128 @@
 # Imports
 #----------------------------------------------------------------------------#
 
+import os
 import sys
-import json
-import dateutil.parser
+import functools
 import babel
-from datetime import datetime
+import babel.dates
 from flask import (
   Flask, 
+  Blueprint,
+  current_app,
   render_template, 
   request, Response, 
   flash, 
+  get_flashed_messages,
+  stream_with_context,
   redirect, 
   url_for, 
-  jsonify
+  jsonify,
+  abort
 )
 from flask_moment import Moment
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import noload
 import logging
 from logging import Formatter, FileHandler
-from flask_wtf import FlaskForm as Form
-from forms import *
-from flask_migrate import Migrate
+from jinja2 import FileSystemBytecodeCache
+from forms import VenueForm, ArtistForm, ShowForm
 from models import db, Show, Artist, Venue
+from queries import (
+  venue_areas,
+  artist_page,
+  show_page,
+  upcoming_show_counts,
+  venue_detail,
+  artist_detail,
+  venue_artist_ids,
+  artist_venue_ids,
+  delete_venues,
+  delete_artists,
+  touch,
+  record_show,
+  show_conflicts,
+  is_double_booking,
+  venues_version,
+  artists_version,
+  shows_version,
+  venue_version,
+  artist_version
+)
+from conditional import conditional, page_version
+from cache import cache, fragment_cache, venue_key, artist_key
+from profiler import profiler
+from executor import query_executor
+import pooling
+import fragments
+from api import api
+from importer import import_command
+from exporter import export_command
+from commands import backfill_genres_command, refresh_show_summary_command
+from search import venue_search, artist_search
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app (app)
-migrate = Migrate(app, db)
+def template_bytecode_cache(directory):
+  # Jinja loads the cached bytecode as code, so only a directory private to
+  # this user will do. Without one Jinja picks and checks its own.
+  if not directory:
+    return FileSystemBytecodeCache()
+  os.makedirs(directory, mode=0o700, exist_ok=True)
+  status = os.stat(directory)
+  if status.st_uid != os.getuid() or status.st_mode & 0o022:
+    raise RuntimeError('TEMPLATE_CACHE_DIR %s must be owned by this user and writable by no one else' % directory)
+  return FileSystemBytecodeCache(directory)
+
+def warm_templates(app):
+  # Compiles every page up front, e.g. in the gunicorn master before it
+  # forks, so no request pays for compiling a template.
+  for name in app.jinja_env.list_templates(extensions=['html']):
+    app.jinja_env.get_template(name)
+
+moment = Moment()
+main = Blueprint('main', __name__)
+
+def create_app(config='config'):
+  app = Flask(__name__)
+  app.config.from_object(config)
+  # Compiled templates are kept on disk, so a new worker loads them
+  # instead of compiling every template again.
+  if app.config['TEMPLATE_CACHE']:
+    app.jinja_options = dict(Flask.jinja_options,
+      bytecode_cache=template_bytecode_cache(app.config['TEMPLATE_CACHE_DIR']))
+  moment.init_app(app)
+  pooling.init_app(app)
+  db.init_app(app)
+  cache.init_app(app)
+  fragments.init_app(app)
+  profiler.init_app(app)
+  query_executor.init_app(app)
+  app.register_blueprint(main)
+  app.register_blueprint(api)
+  # Alembic is only needed by `flask db ...`; web workers skip importing it.
+  if os.environ.get('FLASK_RUN_FROM_CLI'):
+    from flask_migrate import Migrate
+    Migrate(app, db)
+  app.cli.add_command(import_command)
+  app.cli.add_command(export_command)
+  app.cli.add_command(backfill_genres_command)
+  app.cli.add_command(refresh_show_summary_command)
+
+  if not app.debug:
+    file_handler = FileHandler('error.log')
+    file_handler.setFormatter(
+      Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+    )
+    app.logger.setLevel(logging.INFO)
+    file_handler.setLevel(logging.INFO)
+    app.logger.addHandler(file_handler)
+    app.logger.info('errors')
 
+  if app.config['TEMPLATE_WARMUP']:
+    warm_templates(app)
+  return app
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -45,50 +136,76 @@ migrate = Migrate(app, db)
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma"
+}
+
+@functools.lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+  # One entry per (format, locale) pair used by the templates.
+  return (babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)),
+    babel.Locale.parse(locale))
+
+@functools.lru_cache(maxsize=4096)
+def format_datetime_cached(value, format, locale):
+  if format in ('long', 'short'):
+    return babel.dates.format_datetime(value, format, locale=locale)
+  pattern, locale = datetime_pattern(format, locale)
+  return pattern.apply(value, locale)
+
+@main.app_template_filter('datetime')
+def format_datetime(value, format='medium', locale='en'):
+  # Handlers pass datetimes; strings are still accepted but need parsing.
+  if isinstance(value, str):
+    import dateutil.parser
+    value = dateutil.parser.parse(value)
+  return format_datetime_cached(value, format, locale)
+
+#----------------------------------------------------------------------------#
+# Streaming.
+#----------------------------------------------------------------------------#
 
-app.jinja_env.filters['datetime'] = format_datetime
+def stream_template(template_name, **context):
+  # Sends the page while it renders, so lazily generated rows reach the
+  # client as they are read from the database.
+  current_app.update_template_context(context)
+  # Pop flashes now: the session is saved before the body is streamed.
+  get_flashed_messages()
+  template = current_app.jinja_env.get_template(template_name)
+  stream = template.stream(context)
+  stream.enable_buffering(current_app.config['STREAM_BUFFER_SIZE'])
+  return Response(stream_with_context(stream))
+
+def render_listing(template_name, **context):
+  if current_app.config['STREAM_LISTINGS']:
+    return stream_template(template_name, **context)
+  return render_template(template_name, **context)
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
+@main.route('/')
 def index():
   return render_template('pages/home.html')
 
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues')
+@main.route('/venues')
+@conditional(lambda: venues_version())
 def venues():
   error = False
+  data = []
+  next_cursor = None
   try:
-    city_state_list = Venue.query.distinct(Venue.city, Venue.state).all()
-    data = []
-    for city_state in city_state_list:
-      venue_list = Venue.query.filter_by(city=city_state.city, state=city_state.state).all()
-      venues_data = []
-      for ven in venue_list:
-        shows = Show.query.filter_by(venue_id=ven.id).all()
-        num_shows = 0
-        for show in shows:
-          if show.startTime > datetime.now():
-            num_shows = num_shows + 1
-        venues_data.append({"id": ven.id,
-        "name": ven.name,
-        "num_upcoming_shows": num_shows
-        })
-      data.append({"city": city_state.city,
-      "state": city_state.state,
-      "venues": venues_data
-      })
+    data, next_cursor = venue_areas(
+      after=request.args.get('after'),
+      limit=current_app.config['LISTING_PAGE_SIZE'],
+      genre=request.args.get('genre'))
+  except ValueError:
+    abort(400)
   except:
     error=True
     print(sys.exc_info())
@@ -96,26 +213,22 @@ def venues():
     if error:
         flash('An error occurred.')
 
-  return render_template('pages/venues.html', areas=data)
+  return render_listing('pages/venues.html', areas=data, next_cursor=next_cursor)
 
 
-@app.route('/venues/search', methods=['POST'])
+@main.route('/venues/search', methods=['POST'])
 def search_venues():
   error = False
   try:
-    search_term = request.form.get('search_term')
-    venue_list = Venue.query.filter(Venue.name.like('%' + search_term + '%')).all()
+    search_term = request.form.get('search_term', '')
+    venue_list, count = venue_search.search(search_term, current_app.config['SEARCH_RESULT_LIMIT'])
+    counts = upcoming_show_counts(Show.venue_id, [obj.id for obj in venue_list])
     data = []
     for obj in venue_list:
-      shows = Show.query.filter_by(venue_id=obj.id).all()
-      num_shows = 0
-      for show in shows:
-        if show.startTime > datetime.now():
-          num_shows = num_shows 
-      data.append({"id": obj.id, "name": obj.name, "num_upcoming_shows": num_shows})
+      data.append({"id": obj.id, "name": obj.name, "num_upcoming_shows": counts[obj.id]})
 
     response={
-      "count": len(venue_list),
+      "count": count,
       "data": data
     }
   except:
@@ -127,70 +240,47 @@ def search_venues():
 
   return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
-@app.route('/venues/<int:venue_id>')
+@main.route('/venues/<int:venue_id>')
+@conditional(lambda venue_id: venue_version(venue_id))
 def show_venue(venue_id):
   error = False
   data={}
   try:
-    venue = Venue.query.filter_by(id=venue_id).all()[0]
-    upcoming_shows = []
-    past_shows =[]
-    for show in venue.shows:
-      if show.startTime > datetime.now():
-        upcoming_shows.append({
-          "artist_id": show.artist.id, 
-          "artist_name": show.artist.name,
-          "artist_image_link": show.artist.image_link,
-          "start_time": str(show.startTime)
-          })
-      else:
-        past_shows.append({
-          "artist_id": show.artist.id, 
-          "artist_name": show.artist.name,
-          "artist_image_link": show.artist.image_link,
-          "start_time": str(show.startTime)
-          })
-    data={
-      "id": venue.id,
-      "name": venue.name,
-      "address": venue.address,
-      "city": venue.city,
-      "state": venue.state,
-      "phone": venue.phone,
-      "website": venue.website,
-      "facebook_link": venue.facebook_link,
-      "seeking_talent": venue.seeking_talent,
-      "seeking_description": venue.seeking_description,
-      "image_link": venue.image_link,
-      "past_shows": past_shows,
-      "upcoming_shows": upcoming_shows,
-      "past_shows_count": len(past_shows),
-      "upcoming_shows_count": len(upcoming_shows)
-    }
+    limit = current_app.config['DETAIL_SHOWS_LIMIT']
+    past_after = request.args.get('past_after')
+    if past_after:
+      data = venue_detail(venue_id, limit, past_after)
+    else:
+      data = cache.get_or_set(venue_key(venue_id), lambda: venue_detail(venue_id, limit), page_version())
+  except ValueError:
+    abort(400)
   except:
     error=True
     print(sys.exc_info())
   finally:
     if error:
         flash('An error occurred.')
+  if data is None:
+    abort(404)
 
   return render_template('pages/show_venue.html', venue=data)
 
 #  Create Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@main.route('/venues/create', methods=['GET'])
 def create_venue_form():
   form = VenueForm(request.form)
   return render_template('forms/new_venue.html', form=form)
 
-@app.route('/venues/create', methods=['POST'])
+@main.route('/venues/create', methods=['POST'])
 def create_venue_submission():
   error = False
   form = VenueForm(request.form)
   try:
     venue = Venue()
     form.populate_obj(venue)
+    venue.seeking_talent = form.seeking_talent.data == 'True'
     db.session.add(venue)
     db.session.commit()
   except:
@@ -206,26 +296,17 @@ def create_venue_submission():
       
   return render_template('pages/home.html')
   
-@app.route('/venues/<int:venue_id>/delete', methods=['POST'])
+@main.route('/venues/<int:venue_id>/delete', methods=['POST'])
 def delete_venue(venue_id):
   error = False
+  name = Venue.query.options(noload(Venue.shows)).get_or_404(venue_id).name
   try:
-    shows = Show.query.filter_by(venue_id=venue_id).all()
-    for show in shows:
-      try:
-        db.session.delete(show)
-        db.session.commit()
-      except:
-        db.session.rollback()
-        error = True
-        print(sys.exc_info())
-        break
-    venue = Venue.query.filter_by(id=venue_id).all()[0]
-    name = venue.name
-    db.session.delete(venue)
+    _, artist_ids = delete_venues([venue_id])
     db.session.commit()
+    cache.delete(venue_key(venue_id), *map(artist_key, artist_ids))
+    venue_search.invalidate()
   except:
-    db.sesison.rollback()
+    db.session.rollback()
     error = True
     print(sys.exc_info())
   finally:
@@ -240,17 +321,19 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 
-@app.route('/artists')
+@main.route('/artists')
+@conditional(lambda: artists_version())
 def artists():
   error = False
+  data = []
+  next_cursor = None
   try:
-    artist_list = Artist.query.all()
-    data = []
-    for art in artist_list:
-      data.append({
-        "id": art.id,
-        "name": art.name
-      })
+    data, next_cursor = artist_page(
+      after=request.args.get('after'),
+      limit=current_app.config['LISTING_PAGE_SIZE'],
+      genre=request.args.get('genre'))
+  except ValueError:
+    abort(400)
   except:
     error=True
     print(sys.exc_info())
@@ -258,25 +341,21 @@ def artists():
     if error:
         flash('An error occurred.')
   
-  return render_template('pages/artists.html', artists=data)
+  return render_template('pages/artists.html', artists=data, next_cursor=next_cursor)
 
-@app.route('/artists/search', methods=['POST'])
+@main.route('/artists/search', methods=['POST'])
 def search_artists():
   error = False
   try:
-    search_term = request.form.get('search_term')
-    artist_list = Artist.query.filter(Artist.name.like('%' + search_term + '%')).all()
+    search_term = request.form.get('search_term', '')
+    artist_list, count = artist_search.search(search_term, current_app.config['SEARCH_RESULT_LIMIT'])
+    counts = upcoming_show_counts(Show.artist_id, [obj.id for obj in artist_list])
     data = []
     for obj in artist_list:
-      shows = Show.query.filter_by(venue_id=obj.id).all()
-      num_shows = 0
-      for show in shows:
-        if show.startTime > datetime.now():
-          num_shows = num_shows + 1
-      data.append({"id": obj.id, "name": obj.name, "num_upcoming_shows": num_shows})
+      data.append({"id": obj.id, "name": obj.name, "num_upcoming_shows": counts[obj.id]})
 
     response={
-      "count": len(artist_list),
+      "count": count,
       "data": data
     }
   except:
@@ -288,62 +367,39 @@ def search_artists():
     
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
-@app.route('/artists/<int:artist_id>')
+@main.route('/artists/<int:artist_id>')
+@conditional(lambda artist_id: artist_version(artist_id))
 def show_artist(artist_id):
   error = False
   data={}
   try:
-    artist = Artist.query.filter_by(id=artist_id).all()[0]
-    upcoming_shows = []
-    past_shows =[]
-    for show in artist.shows:
-      if show.startTime > datetime.now():
-        upcoming_shows.append({
-          "venue_id": show.venue.id, 
-          "venue_name": show.venue.name,
-          "venue_image_link": show.venue.image_link,
-          "start_time": show.startTime
-          })
-      else:
-        past_shows.append({
-          "venue_id": show.venue.id, 
-          "venue_name": show.venue.name,
-          "venue_image_link": show.venue.image_link,
-          "start_time": str(show.startTime)
-          })
-    data={
-      "id": artist.id,
-      "name": artist.name,
-      "city": artist.city,
-      "state": artist.state,
-      "phone": artist.phone,
-      "website": artist.website,
-      "facebook_link": artist.facebook_link,
-      "seeking_venue": artist.seeking_venue,
-      "seeking_description": artist.seeking_description,
-      "image_link": artist.image_link,
-      "past_shows": past_shows,
-      "upcoming_shows": upcoming_shows,
-      "past_shows_count": len(past_shows),
-      "upcoming_shows_count": len(upcoming_shows)
-    }
+    limit = current_app.config['DETAIL_SHOWS_LIMIT']
+    past_after = request.args.get('past_after')
+    if past_after:
+      data = artist_detail(artist_id, limit, past_after)
+    else:
+      data = cache.get_or_set(artist_key(artist_id), lambda: artist_detail(artist_id, limit), page_version())
+  except ValueError:
+    abort(400)
   except:
     error=True
     print(sys.exc_info())
   finally:
     if error:
         flash('An error occurred.')
+  if data is None:
+    abort(404)
 
   return render_template('pages/show_artist.html', artist=data)
 
 #  Update
 #  ----------------------------------------------------------------
 
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@main.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
   error = False
+  artist = Artist.query.options(noload(Artist.shows)).get_or_404(artist_id)
   try:
-    artist = Artist.query.first_or_404(artist_id)
     form = ArtistForm(obj=artist)
   except:
     error=True
@@ -356,7 +412,7 @@ def edit_artist(artist_id):
   
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
   error = False
   form = ArtistForm(request.form)
@@ -369,9 +425,13 @@ def edit_artist_submission(artist_id):
     artist.facebook_link = form.facebook_link.data
     artist.image_link = form.image_link.data
     artist.website = form.website.data
+    artist.genres = form.genres.data
     #artist.seeking_venue = form.seeking_venue.data
     artist.seeking_description = form.seeking_description.data
+    venue_ids = artist_venue_ids(artist_id)
+    touch(Venue, venue_ids)
     db.session.commit()
+    cache.delete(artist_key(artist_id), *map(venue_key, venue_ids))
   except:
     db.session.rollback()
     error=True
@@ -384,13 +444,13 @@ def edit_artist_submission(artist_id):
         flash('An error occurred. Artist ' + artist.name + ' could not be edited.')
  
 
-  return redirect(url_for('show_artist', artist_id=artist_id))
+  return redirect(url_for('main.show_artist', artist_id=artist_id))
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@main.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
   error = False
+  venue = Venue.query.options(noload(Venue.shows)).get_or_404(venue_id)
   try:
-    venue = Venue.query.first_or_404(venue_id)
     form = VenueForm(obj=venue)
   except:
     error=True
@@ -401,7 +461,7 @@ def edit_venue(venue_id):
  
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
   error = False
   form = VenueForm(request.form)
@@ -415,9 +475,13 @@ def edit_venue_submission(venue_id):
     venue.facebook_link = form.facebook_link.data 
     venue.image_link = form.image_link.data
     venue.website = form.website.data
+    venue.genres = form.genres.data
     #venue.seeking_talent = form.seeking_talent.data
     venue.seeking_description = form.seeking_description.data
+    artist_ids = venue_artist_ids(venue_id)
+    touch(Artist, artist_ids)
     db.session.commit()
+    cache.delete(venue_key(venue_id), *map(artist_key, artist_ids))
   except:
     db.session.rollback()
     error=True
@@ -429,23 +493,24 @@ def edit_venue_submission(venue_id):
     else:
         flash('An error occurred. Venue ' + venue.name + ' could not be edited.')
   
-  return redirect(url_for('show_venue', venue_id=venue_id))
+  return redirect(url_for('main.show_venue', venue_id=venue_id))
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@main.route('/artists/create', methods=['GET'])
 def create_artist_form():
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
-@app.route('/artists/create', methods=['POST'])
+@main.route('/artists/create', methods=['POST'])
 def create_artist_submission():
   error = False
   form = ArtistForm(request.form)
   try:
     artist = Artist()
     form.populate_obj(artist)
+    artist.seeking_venue = form.seeking_venue.data == 'True'
     db.session.add(artist)
     db.session.commit()
   except:
@@ -460,26 +525,43 @@ def create_artist_submission():
         flash('An error occurred. Venue ' + artist.name + ' could not be listed.')
   return render_template('pages/home.html')
 
+@main.route('/artists/<int:artist_id>/delete', methods=['POST'])
+def delete_artist(artist_id):
+  error = False
+  name = Artist.query.options(noload(Artist.shows)).get_or_404(artist_id).name
+  try:
+    _, venue_ids = delete_artists([artist_id])
+    db.session.commit()
+    cache.delete(artist_key(artist_id), *map(venue_key, venue_ids))
+    artist_search.invalidate()
+  except:
+    db.session.rollback()
+    error = True
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    if not error:
+      flash('Artist ' + name + ' was successfully deleted!')
+    else:
+      flash('An error occured. Artist ' + name + ' could not be deleted.')
+
+  return render_template('pages/home.html')
+
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@main.route('/shows')
+@conditional(lambda: shows_version())
 def shows():
   error = False
+  data = []
+  next_cursor = None
   try:
-    show_list = Show.query.all()
-    data = []
-    for show in show_list:
-      venue = Venue.query.filter(Venue.id==show.venue_id).all()
-      artist = Artist.query.filter(Artist.id==show.artist_id).all()
-      data.append({
-      "venue_id": venue[0].id,
-      "venue_name": venue[0].name,
-      "artist_id": artist[0].id,
-      "artist_name": artist[0].name,
-      "artist_image_link": artist[0].image_link,
-      "start_time": str(show.startTime)
-      })
+    data, next_cursor = show_page(
+      after=request.args.get('after'),
+      limit=current_app.config['LISTING_PAGE_SIZE'])
+  except ValueError:
+    abort(400)
   except:
     error=True
     print(sys.exc_info())
@@ -487,62 +569,86 @@ def shows():
     if error:
         flash('An error occurred.')
         
-  return render_template('pages/shows.html', shows=data)
+  return render_listing('pages/shows.html', shows=data, next_cursor=next_cursor)
 
-@app.route('/shows/create')
+@main.route('/shows/create')
 def create_shows():
   # renders form.
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
-@app.route('/shows/create', methods=['POST'])
+@main.route('/shows/create', methods=['POST'])
 def create_show_submission():
   error = False
+  booked = False
   form = ShowForm(request.form)
   try:
     show = Show()
     form.populate_obj(show)
-    db.session.add(show)
-    db.session.commit()
+    show.startTime = form.start_time.data
+    if not form.duration.validate(form):
+      raise ValueError(form.duration.errors)
+    booked = bool(show_conflicts(int(show.venue_id), int(show.artist_id), show.startTime, show.duration))
+    if not booked:
+      db.session.add(show)
+      touch(Venue, [show.venue_id])
+      touch(Artist, [show.artist_id])
+      record_show(show.venue_id, show.artist_id, show.startTime)
+      db.session.commit()
+      cache.delete(venue_key(int(show.venue_id)), artist_key(int(show.artist_id)))
+  except IntegrityError as e:
+    # On PostgreSQL the exclusion constraints also reject a show booked
+    # concurrently for the same time.
+    db.session.rollback()
+    booked = is_double_booking(e)
+    error = not booked
+    print(sys.exc_info())
   except:
     db.session.rollback()
     error=True
     print(sys.exc_info())
   finally:
     db.session.close()
-    if error:
+    if booked:
+        flash('Show could not be listed: the venue or the artist is already booked at that time.')
+    elif error:
         flash('An error occurred show could not be listed.')
     else:
         flash('Show was successfully listed!')
   return render_template('pages/home.html')
 
 
+#  Monitoring
+#  ----------------------------------------------------------------
+
+@main.route('/metrics')
+def metrics():
+  return jsonify({
+    "cache": cache.stats(),
+    "fragment_cache": fragment_cache.stats(),
+    "pool": pooling.pool_stats(db.engine)
+  })
+
+
 # Error handlers
 # -------------------------------------------------------
 
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
-
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
 
+# Module-level app for `gunicorn app:app` and `flask run`.
+app = create_app()
+
 # Default port:
 if __name__ == '__main__':
     app.run(port=5000, debug=True)
@@ -0,0 +1,498 @@
+"""Benchmark every page of the app against a seeded synthetic dataset.
+
+    python benchmark.py --venues 1000 --artists 2000 --shows 50000 -o report.json
+    python benchmark.py -o new.json --compare report.json
+
+The database given with --database (a throwaway SQLite file by default) is
+dropped and reseeded. Each route is requested in-process through the test
+client and reported with latency percentiles, SQL statement counts and
+peak Python memory, together with worker startup time and a few targeted
+scenarios. With --url the same routes are load-tested over HTTP against a
+running server instead, e.g. to compare sync and gevent workers; the
+server reports statement counts only when started with QUERY_PROFILER=1.
+
+The venues, artists and shows written by the form routes and scenarios are
+named BENCH_PREFIX and deleted again when the run ends, so --skip-seed
+runs always measure the same dataset.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+import urllib.parse
+import urllib.request
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATABASE = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'fyyur-benchmark.db')
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+          'Funk', 'Hip-Hop', 'Jazz', 'Pop', 'Punk', 'R&B', 'Rock n Roll', 'Soul']
+STATES = ['CA', 'NY', 'TX', 'WA', 'IL', 'FL']
+
+# Start of the name of every venue and artist the benchmark writes itself.
+BENCH_PREFIX = 'Benchmark '
+
+#----------------------------------------------------------------------------#
+# Dataset.
+#----------------------------------------------------------------------------#
+
+def _insert(table, rows, batch_size=5000):
+    from models import db
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[start:start + batch_size])
+    db.session.commit()
+
+
+def seed(venues, artists, shows, past_ratio, rng):
+    """Recreate the schema and fill it with random venues, artists and shows."""
+    from bookings import BookingIndex, booking
+    from models import db, Venue, Artist, Show
+    from queries import refresh_show_summaries
+    from search import venue_search, artist_search
+
+    db.drop_all()
+    db.create_all()
+
+    cities = ['City %d' % i for i in range(max(1, venues // 20))]
+    _insert(Venue.__table__, [{
+        "name": 'Venue %d' % i,
+        "genres": rng.sample(GENRES, rng.randint(1, 3)),
+        "city": rng.choice(cities),
+        "state": rng.choice(STATES),
+        "address": '%d Main Street' % i,
+        "phone": '555-%04d' % i,
+        "image_link": 'https://example.com/venues/%d.jpg' % i,
+        "facebook_link": 'https://facebook.com/venue%d' % i,
+        "website": 'https://venue%d.example.com' % i,
+        "seeking_talent": i % 2 == 0,
+        "seeking_description": 'Looking for local acts'
+    } for i in range(venues)])
+    _insert(Artist.__table__, [{
+        "name": 'Artist %d' % i,
+        "genres": rng.sample(GENRES, rng.randint(1, 3)),
+        "city": rng.choice(cities),
+        "state": rng.choice(STATES),
+        "phone": '555-%04d' % i,
+        "image_link": 'https://example.com/artists/%d.jpg' % i,
+        "facebook_link": 'https://facebook.com/artist%d' % i,
+        "website": 'https://artist%d.example.com' % i,
+        "seeking_venue": i % 3 == 0,
+        "seeking_description": 'Touring this year'
+    } for i in range(artists)])
+    now = datetime.now().replace(second=0, microsecond=0)
+    # Candidates double-booking a venue or artist are dropped.
+    index = BookingIndex()
+    rows = []
+    for _ in range(shows):
+        row = {
+            "venue_id": rng.randint(1, venues),
+            "artist_id": rng.randint(1, artists),
+            "startTime": now + timedelta(
+                minutes=rng.randint(1, 525600) * (-1 if rng.random() < past_ratio else 1)),
+            "duration": rng.choice((60, 90, 120, 180))
+        }
+        booked = booking(row['startTime'], row['duration'])
+        keys = (('venue_id', row['venue_id']), ('artist_id', row['artist_id']))
+        if not any(index.conflicts(key, booked.start, booked.end) for key in keys):
+            for key in keys:
+                index.add(key, booked)
+            rows.append(row)
+    _insert(Show.__table__, rows)
+    refresh_show_summaries(Show.venue_id, now)
+    refresh_show_summaries(Show.artist_id, now)
+    # The rows were inserted without the ORM events that reset the index.
+    venue_search.invalidate()
+    artist_search.invalidate()
+
+#----------------------------------------------------------------------------#
+# Routes.
+#----------------------------------------------------------------------------#
+
+# Views that serve files or debugging aids rather than pages, or that need
+# query parameters (added by routes()).
+SKIPPED_ENDPOINTS = {'static', 'debug_queries', 'api.check_show'}
+
+
+def venue_form(name):
+    return {
+        "name": name, "city": 'Benchmark City', "state": 'CA', "address": '1 Bench Street',
+        "phone": '555-0100', "genres": ['Jazz', 'Soul'], "image_link": 'https://example.com/bench.jpg',
+        "facebook_link": 'https://facebook.com/bench', "website": 'https://bench.example.com',
+        "seeking_talent": 'True', "seeking_description": 'Benchmark'
+    }
+
+
+def artist_form(name):
+    return {
+        "name": name, "city": 'Benchmark City', "state": 'CA', "phone": '555-0101',
+        "genres": ['Jazz', 'Soul'], "image_link": 'https://example.com/bench.jpg',
+        "facebook_link": 'https://facebook.com/bench', "website": 'https://bench.example.com',
+        "seeking_venue": 'True', "seeking_description": 'Benchmark'
+    }
+
+
+def routes(app, rng):
+    """Return [(name, method, path, form)] for every route; `path` draws a URL.
+
+    `form` is None for GET routes and draws the submitted fields otherwise.
+    The form routes create venues and artists named BENCH_PREFIX, edit a
+    venue and an artist created here, and book shows between those two,
+    so conflicts are checked against a growing list of bookings.
+    """
+    from models import db, Venue, Artist
+    venue_ids = [id for id, in db.session.query(Venue.id)]
+    artist_ids = [id for id, in db.session.query(Artist.id)]
+    ids = {'venue_id': lambda: rng.choice(venue_ids), 'artist_id': lambda: rng.choice(artist_ids)}
+    found = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint in SKIPPED_ENDPOINTS or 'GET' not in rule.methods:
+            continue
+        if any(argument not in ids for argument in rule.arguments):
+            continue
+        found.append((rule.rule, 'GET', lambda rule=rule: rule.build(
+            {name: ids[name]() for name in rule.arguments}, append_unknown=False)[1], None))
+    for path in ('/venues/search', '/artists/search'):
+        found.append((path + ' (POST)', 'POST', lambda path=path: path,
+                      lambda: {'search_term': 'venue %d' % rng.randint(1, 99)}))
+    found.append(('/api/v1/shows/conflicts', 'GET', lambda: '/api/v1/shows/conflicts?%s' % urllib.parse.urlencode({
+        'venue_id': rng.choice(venue_ids),
+        'artist_id': rng.choice(artist_ids),
+        'start_time': (datetime.now() + timedelta(days=rng.randint(1, 365))).isoformat(timespec='minutes')
+    }), None))
+    found.append(('/venues?genre=', 'GET',
+                  lambda: '/venues?genre=' + urllib.parse.quote(rng.choice(GENRES)), None))
+
+    venue = Venue(**dict(venue_form(BENCH_PREFIX + 'stage'), seeking_talent=True))
+    artist = Artist(**dict(artist_form(BENCH_PREFIX + 'band'), seeking_venue=True))
+    db.session.add_all([venue, artist])
+    db.session.commit()
+    venue_id, artist_id = venue.id, artist.id
+    found.extend([
+        ('/venues/create (POST)', 'POST', lambda: '/venues/create',
+         lambda: venue_form(BENCH_PREFIX + 'venue %d' % rng.randint(1, 10 ** 6))),
+        ('/artists/create (POST)', 'POST', lambda: '/artists/create',
+         lambda: artist_form(BENCH_PREFIX + 'artist %d' % rng.randint(1, 10 ** 6))),
+        ('/venues/<int:venue_id>/edit (POST)', 'POST', lambda: '/venues/%d/edit' % venue_id,
+         lambda: venue_form(BENCH_PREFIX + 'stage')),
+        ('/artists/<int:artist_id>/edit (POST)', 'POST', lambda: '/artists/%d/edit' % artist_id,
+         lambda: artist_form(BENCH_PREFIX + 'band')),
+        ('/shows/create (POST)', 'POST', lambda: '/shows/create', lambda: {
+            'venue_id': venue_id,
+            'artist_id': artist_id,
+            'start_time': (datetime.now() + timedelta(minutes=rng.randint(60, 60 * 24 * 3650))).strftime('%Y-%m-%d %H:%M:%S'),
+            'duration': 60
+        })
+    ])
+    return found
+
+
+def cleanup(app, base_url=None):
+    """Delete the venues and artists named BENCH_PREFIX, with their shows.
+
+    They go through the bulk delete API, of the server at `base_url` if
+    given, so its caches and search index forget them too.
+    """
+    from models import db, Venue, Artist
+    with app.app_context():
+        ids = {kind: [id for id, in db.session.query(model.id).filter(model.name.startswith(BENCH_PREFIX))]
+               for kind, model in (('venues', Venue), ('artists', Artist))}
+        db.session.remove()
+    for kind, kind_ids in ids.items():
+        if not kind_ids:
+            continue
+        path = '/api/v1/%s/delete' % kind
+        if base_url:
+            request = urllib.request.Request(
+                base_url.rstrip('/') + path, data=json.dumps({'ids': kind_ids}).encode(),
+                headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+        else:
+            app.test_client().post(path, json={'ids': kind_ids})
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def _summary(latencies, **extra):
+    summary = {
+        "requests": len(latencies),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3)
+    }
+    summary.update(extra)
+    return summary
+
+
+class StatementCounter:
+    """Counts the SQL statements executed by this process."""
+
+    def __init__(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        self.count = 0
+        event.listen(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def bench_routes(app, route_list, requests):
+    """Measure each route through the test client."""
+    client = app.test_client()
+    counter = StatementCounter()
+    report = {}
+    for name, method, path, form in route_list:
+        def call():
+            target = path()
+            if method == 'POST':
+                response = client.post(target, data=form())
+            else:
+                response = client.get(target)
+            response.get_data()
+            response.close()
+            return response.status_code
+        status = call()  # Warm caches and compiled templates first.
+        latencies, statements = [], []
+        for _ in range(requests):
+            before = counter.count
+            start = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - start)
+            statements.append(counter.count - before)
+        tracemalloc.start()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report[name] = _summary(
+            latencies,
+            status=status,
+            queries=max(statements),
+            peak_kib=round(peak / 1024, 1))
+        print('%-40s %8.2f ms p50 %8.2f ms p95 %4d queries' % (
+            name, report[name]['p50_ms'], report[name]['p95_ms'], report[name]['queries']))
+    return report
+
+
+def bench_http(base_url, route_list, requests, concurrency):
+    """Load-test each route of a running server with `concurrency` clients."""
+    report = {}
+    for name, method, path, form in route_list:
+        latencies, statements, errors = [], [], 0
+        lock = threading.Lock()
+
+        def call(_):
+            nonlocal errors
+            data = urllib.parse.urlencode(form(), doseq=True).encode() if form else None
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url.rstrip('/') + path(), data=data, timeout=60) as response:
+                    response.read()
+                    count = response.headers.get('X-DB-Query-Count')
+            except Exception:
+                with lock:
+                    errors += 1
+                return
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                if count is not None:
+                    statements.append(int(count))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(call, range(requests)))
+        elapsed = time.perf_counter() - start
+        report[name] = _summary(
+            latencies or [0.0],
+            errors=errors,
+            queries=max(statements) if statements else None,
+            throughput_rps=round(len(latencies) / elapsed, 1))
+        print('%-40s %8.2f ms p50 %8.2f ms p95 %8.1f req/s' % (
+            name, report[name]['p50_ms'], report[name]['p95_ms'], report[name]['throughput_rps']))
+    return report
+
+#----------------------------------------------------------------------------#
+# Scenarios.
+#----------------------------------------------------------------------------#
+
+def bench_startup(database, runs=3):
+    """Seconds for a fresh interpreter to import the app, best of `runs`."""
+    env = dict(os.environ, DATABASE_URL=database)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import app'], cwd=HERE, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return {"import_s": round(min(timings), 3)}
+
+
+def bench_datetime_filter():
+    """Microseconds per call of the `datetime` template filter."""
+    from app import format_datetime
+    value = datetime(2030, 5, 17, 21, 30)
+    number = 20000
+    return {
+        "datetime_full_us": round(timeit.timeit(lambda: format_datetime(value, 'full'), number=number) / number * 1e6, 3),
+        "datetime_string_us": round(timeit.timeit(lambda: format_datetime('2030-05-17 21:30:00', 'full'), number=2000) / 2000 * 1e6, 3)
+    }
+
+
+def bench_delete_venue(app, shows):
+    """Delete a venue holding `shows` shows through the web view."""
+    from models import db, Venue, Artist, Show
+    with app.app_context():
+        venue = Venue(name=BENCH_PREFIX + 'doomed venue', city='Nowhere', state='CA',
+                      address='1 Last Street', phone='555-0000', genres=['Jazz'])
+        artist = Artist(name=BENCH_PREFIX + 'resident', city='Nowhere', state='CA',
+                        phone='555-0001', genres=['Jazz'])
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        venue_id = venue.id
+        now = datetime.now()
+        _insert(Show.__table__, [{"venue_id": venue_id, "artist_id": artist.id, "duration": 60,
+                                  "startTime": now + timedelta(hours=i)} for i in range(shows)])
+    counter = StatementCounter()
+    start = time.perf_counter()
+    response = app.test_client().post('/venues/%d/delete' % venue_id)
+    return {
+        "shows": shows,
+        "status": response.status_code,
+        "ms": round((time.perf_counter() - start) * 1000, 3),
+        "queries": counter.count
+    }
+
+#----------------------------------------------------------------------------#
+# Reports.
+#----------------------------------------------------------------------------#
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Print the change of each route's p50, p95 and query count against `baseline`."""
+    print('\n%-40s %12s %12s %10s' % ('route', 'p50', 'p95', 'queries'))
+    for name, current in sorted(report['routes'].items()):
+        previous = baseline.get('routes', {}).get(name)
+        if previous is None:
+            print('%-40s %12s' % (name, 'new'))
+            continue
+
+        def change(key):
+            if not previous.get(key):
+                return '-'
+            return '%+.1f%%' % ((current[key] - previous[key]) / previous[key] * 100)
+
+        print('%-40s %12s %12s %10s' % (
+            name, change('p50_ms'), change('p95_ms'),
+            '%s -> %s' % (previous.get('queries'), current.get('queries'))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database', default=DEFAULT_DATABASE,
+                        help='Database to DROP and reseed (default: %(default)s).')
+    parser.add_argument('--force', action='store_true',
+                        help='Reseed a database whose name does not contain "bench".')
+    parser.add_argument('--venues', type=int, default=200)
+    parser.add_argument('--artists', type=int, default=400)
+    parser.add_argument('--shows', type=int, default=5000)
+    parser.add_argument('--past-ratio', type=float, default=0.5, help='Share of shows in the past.')
+    parser.add_argument('--requests', type=int, default=30, help='Timed requests per route.')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the page and fragment caches.')
+    parser.add_argument('--skip-seed', action='store_true', help='Reuse the data already in --database.')
+    parser.add_argument('--url', help='Load-test a running server instead of the in-process app.')
+    parser.add_argument('--concurrency', type=int, default=10, help='Parallel clients with --url.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the dataset and routes.')
+    parser.add_argument('--output', '-o', help='Write the JSON report to this file.')
+    parser.add_argument('--compare', help='Compare with an earlier JSON report.')
+    args = parser.parse_args(argv)
+    if not args.skip_seed and 'bench' not in args.database.rsplit('/', 1)[-1] and not args.force:
+        parser.error('refusing to drop %s; name it *bench* or pass --force' % args.database)
+
+    rng = random.Random(args.seed)
+    os.environ['DATABASE_URL'] = args.database
+    if args.no_cache:
+        os.environ['CACHE_TYPE'] = 'null'
+    sys.path.insert(0, HERE)
+    os.chdir(HERE)
+    from app import app
+    from models import db
+    # Added after flask_wtf installs its own filter for the warning.
+    warnings.filterwarnings('ignore', message='"flask_wtf.Form" has been renamed')
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['FRAGMENT_CACHE'] = not args.no_cache
+    # The query profiler's per-request log lines would drown the report.
+    app.logger.setLevel(logging.WARNING)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec='seconds'),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "database": args.database.split(':', 1)[0],
+            "requests": args.requests,
+            "cache": not args.no_cache,
+            "target": args.url or 'test client'
+        }
+    }
+    if args.skip_seed:
+        # Rows left behind by an interrupted run.
+        cleanup(app, args.url)
+    with app.app_context():
+        if not args.skip_seed:
+            start = time.perf_counter()
+            seed(args.venues, args.artists, args.shows, args.past_ratio, rng)
+            report['meta']['seed_s'] = round(time.perf_counter() - start, 3)
+        from models import Venue, Artist, Show
+        for name, model in (('venues', Venue), ('artists', Artist), ('shows', Show)):
+            report['meta'][name] = model.query.count()
+        route_list = routes(app, rng)
+        db.session.remove()
+
+    try:
+        if args.url:
+            report['meta']['concurrency'] = args.concurrency
+            report['routes'] = bench_http(args.url, route_list, args.requests, args.concurrency)
+        else:
+            report['routes'] = bench_routes(app, route_list, args.requests)
+            report['startup'] = bench_startup(args.database)
+            report['micro'] = bench_datetime_filter()
+            report['scenarios'] = {"delete_venue": bench_delete_venue(app, 10000)}
+            print('startup', report['startup'], 'micro', report['micro'], 'scenarios', report['scenarios'])
+    finally:
+        cleanup(app, args.url)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(report, json.load(file))
+    return report
+
+
+if __name__ == '__main__':
+    main()
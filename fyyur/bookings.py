@@ -0,0 +1,85 @@
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import timedelta
+
+#----------------------------------------------------------------------------#
+# Bookings.
+#----------------------------------------------------------------------------#
+
+# The period [start, end) a venue or artist is booked for a show.
+Booking = namedtuple('Booking', 'start end show_id')
+
+
+def booking(start_time, duration, show_id=None):
+    """Return the Booking of a show starting at `start_time` and lasting `duration` minutes."""
+    return Booking(start_time, start_time + timedelta(minutes=duration), show_id)
+
+
+def free_periods(bookings, start, end):
+    """Return the (start, end) periods of [start, end) outside `bookings`.
+
+    `bookings` must be sorted by start and must not overlap each other.
+    """
+    free = []
+    for booked in bookings:
+        if booked.start > start:
+            free.append((start, min(booked.start, end)))
+        start = max(start, booked.end)
+    if start < end:
+        free.append((start, end))
+    return free
+
+#----------------------------------------------------------------------------#
+# Index.
+#----------------------------------------------------------------------------#
+
+class BookingIndex:
+    """Bookings of venues and artists, sorted by start time under a key each.
+
+    The bookings of one key never overlap, so their ends are in order too:
+    the ones overlapping a period are found by bisecting the starts for
+    the first booking at or after its end and walking back while they end
+    after its start. A check costs O(log n) comparisons plus one per
+    conflict. Empty bookings overlap nothing and are not stored.
+    """
+
+    def __init__(self):
+        self._starts = {}
+        self._bookings = {}
+
+    def __contains__(self, key):
+        return key in self._bookings
+
+    def load(self, key, bookings):
+        """Replace the bookings of `key`; they must not overlap each other."""
+        bookings = sorted(booked for booked in bookings if booked.end > booked.start)
+        self._bookings[key] = bookings
+        self._starts[key] = [booked.start for booked in bookings]
+
+    def conflicts(self, key, start, end):
+        """Return the bookings of `key` overlapping [start, end), by start time."""
+        if end <= start or key not in self._bookings:
+            return []
+        bookings = self._bookings[key]
+        found = []
+        for i in range(bisect_left(self._starts[key], end) - 1, -1, -1):
+            if bookings[i].end <= start:
+                break
+            found.append(bookings[i])
+        return found[::-1]
+
+    def add(self, key, booked):
+        """Store `booked` under `key`, which must not conflict with it."""
+        if booked.end <= booked.start:
+            return
+        starts = self._starts.setdefault(key, [])
+        i = bisect_left(starts, booked.start)
+        starts.insert(i, booked.start)
+        self._bookings.setdefault(key, []).insert(i, booked)
+
+    def remove(self, key, booked):
+        starts = self._starts.get(key, [])
+        i = bisect_left(starts, booked.start)
+        if i < len(starts) and self._bookings[key][i] == booked:
+            del starts[i]
+            del self._bookings[key][i]
@@ -0,0 +1,206 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+
+class NullCache:
+    """Backend that never stores anything, for CACHE_TYPE = 'null'."""
+
+    def get(self, key):
+        return None
+
+    def get_many(self, keys):
+        return [None] * len(keys)
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+
+class LRUCache:
+    """In-process cache bounded by entry count, with per-entry expiry."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class RedisCache:
+    """Cache stored in Redis, shared by every worker.
+
+    `client` only needs redis-py's get/mget/set/delete, so any compatible
+    stand-in can be passed instead of a real connection.
+    """
+
+    def __init__(self, client, ttl=300, prefix='fyyur:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        values = self.client.mget([self.prefix + key for key in keys])
+        return [None if value is None else pickle.loads(value) for value in values]
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+#----------------------------------------------------------------------------#
+# Cache.
+#----------------------------------------------------------------------------#
+
+def venue_key(venue_id):
+    return 'venue:%d' % venue_id
+
+
+def artist_key(artist_id):
+    return 'artist:%d' % artist_id
+
+
+class Cache:
+    """Read-through cache in front of the configured backend.
+
+    Configured from CACHE_TYPE ('lru', 'redis' or 'null'), CACHE_TTL,
+    CACHE_MAXSIZE and CACHE_REDIS_URL. A ready-made client can be given as
+    CACHE_REDIS_CLIENT, which takes precedence over the URL.
+
+    A cache with a `namespace` keeps its entries apart from those of the
+    others, in a store of its own bounded by <NAMESPACE>_CACHE_MAXSIZE
+    (or under its own key prefix in Redis), and counts its own hits.
+    """
+
+    def __init__(self, app=None, namespace=None):
+        self.namespace = namespace
+        self.backend = NullCache()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_TYPE', 'lru')
+        ttl = app.config.get('CACHE_TTL', 300)
+        if self.namespace:
+            maxsize = app.config.get(self.namespace.upper() + '_CACHE_MAXSIZE', 1024)
+            prefix = 'fyyur:%s:' % self.namespace
+        else:
+            maxsize = app.config.get('CACHE_MAXSIZE', 1024)
+            prefix = 'fyyur:'
+        if kind == 'lru':
+            self.backend = LRUCache(maxsize, ttl)
+        elif kind == 'redis':
+            client = app.config.get('CACHE_REDIS_CLIENT')
+            if client is None:
+                if redis is None:
+                    raise RuntimeError("CACHE_TYPE = 'redis' requires the redis package")
+                client = redis.Redis.from_url(app.config['CACHE_REDIS_URL'])
+            self.backend = RedisCache(client, ttl, prefix)
+        elif kind == 'null':
+            self.backend = NullCache()
+        else:
+            raise ValueError('Unknown CACHE_TYPE %r' % kind)
+        app.extensions['%s_cache' % self.namespace if self.namespace else 'cache'] = self
+
+    def get_or_set(self, key, loader, version=None):
+        """Return the cached value for `key`, calling `loader` on a miss.
+
+        A loader returning None is not cached. With a `version`, the entry
+        is stored along with it and an entry of any other version is a
+        miss, so a change the entry was not invalidated for (a write served
+        by another process of an 'lru' cache, a show starting) is never
+        served. Keys read with a version must always be read with one.
+        """
+        entry = self.backend.get(key)
+        if version is not None and entry is not None:
+            entry = entry[1] if entry[0] == version else None
+        self._count(1 if entry is not None else 0, 1)
+        if entry is not None:
+            return entry
+        value = loader()
+        if value is not None:
+            self.backend.set(key, value if version is None else (version, value))
+        return value
+
+    def get_many(self, keys):
+        """Return {key: cached value} of the `keys` found, in one backend call."""
+        values = self.backend.get_many(keys)
+        found = {key: value for key, value in zip(keys, values) if value is not None}
+        self._count(len(found), len(keys))
+        return found
+
+    def _count(self, hits, lookups):
+        # Every request thread of the process updates these.
+        with self._lock:
+            self.hits += hits
+            self.misses += lookups - hits
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0
+        }
+
+
+cache = Cache()
+fragment_cache = Cache(namespace='fragment')
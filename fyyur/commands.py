@@ -0,0 +1,85 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Text, bindparam, type_coerce
+
+from cache import cache, venue_key, artist_key
+from forms import VenueForm
+from models import db, parse_genres, Show, Venue, Artist
+from queries import STREAM_BATCH_SIZE, keyset_page, refresh_show_summaries
+from search import venue_search, artist_search
+
+#----------------------------------------------------------------------------#
+# Genres.
+#----------------------------------------------------------------------------#
+
+# Spelling of each genre offered by the forms, by lower-cased name.
+GENRES = {value.lower(): value for value, _ in VenueForm.genres.kwargs['choices']}
+
+
+def normalize_genres(value):
+    """Return the genre names of `value`, trimmed, deduplicated and spelled as in the forms."""
+    genres = []
+    for genre in parse_genres(value):
+        genre = GENRES.get(genre.lower(), genre)
+        if genre not in genres:
+            genres.append(genre)
+    return genres
+
+
+def backfill_genres(model, key):
+    """Rewrite the genres of every row of `model` still in a legacy format.
+
+    Returns the number of rows updated. Rows are read in id order and
+    written back one batch per statement.
+    """
+    table = model.__table__
+    postgres = db.engine.dialect.name == 'postgresql'
+    update = table.update().where(
+        table.c.id == bindparam('row_id')
+    ).values(genres=bindparam('new_genres'))
+    updated = 0
+    after = None
+    while True:
+        rows, _ = keyset_page(
+            db.session.query(type_coerce(model.genres, Text).label('raw'), model.id),
+            (model.id,), after, STREAM_BATCH_SIZE)
+        if not rows:
+            break
+        after = (rows[-1].id,)
+        changes = []
+        for row in rows:
+            genres = normalize_genres(row.raw)
+            stored = genres if postgres else model.genres.type.process_bind_param(genres, db.engine.dialect)
+            if row.raw != stored:
+                changes.append({"row_id": row.id, "new_genres": genres})
+        if changes:
+            db.session.execute(update, changes)
+            db.session.commit()
+            cache.delete(*[key(change['row_id']) for change in changes])
+            updated += len(changes)
+    return updated
+
+
+@click.command('backfill-genres')
+@with_appcontext
+def backfill_genres_command():
+    """Convert the genres of existing venues and artists to lists."""
+    for name, model, key, searcher in (('venues', Venue, venue_key, venue_search),
+                                       ('artists', Artist, artist_key, artist_search)):
+        click.echo('%s: %d updated' % (name, backfill_genres(model, key)))
+        searcher.invalidate()
+
+#----------------------------------------------------------------------------#
+# Show summaries.
+#----------------------------------------------------------------------------#
+
+@click.command('refresh-show-summary')
+@click.option('--all', 'everything', is_flag=True, help='Recompute every summary, not only stale ones.')
+@with_appcontext
+def refresh_show_summary_command(everything):
+    """Recompute the show counts of venues and artists whose next show has passed.
+
+    Meant to run every few minutes from cron, with --all once a night.
+    """
+    for name, key in (('venues', Show.venue_id), ('artists', Show.artist_id)):
+        click.echo('%s: %d refreshed' % (name, refresh_show_summaries(key, everything=everything)))
@@ -0,0 +1,74 @@
+import functools
+import hashlib
+
+from flask import abort, current_app, g, make_response, request
+from itsdangerous import BadSignature
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['HTTP_CACHE_MAX_AGE']
+    response.cache_control.s_maxage = current_app.config['HTTP_CACHE_S_MAXAGE']
+    return response
+
+
+def _pending_flashes():
+    # Reads the session cookie itself: going through `session` would make
+    # Flask add Vary: Cookie to the publicly cacheable responses.
+    cookie = request.cookies.get(current_app.session_cookie_name)
+    serializer = current_app.session_interface.get_signing_serializer(current_app)
+    if not cookie or serializer is None:
+        return False
+    max_age = current_app.permanent_session_lifetime.total_seconds()
+    try:
+        return '_flashes' in serializer.loads(cookie, max_age=max_age)
+    except BadSignature:
+        return False
+
+
+def page_version():
+    """Return the version the conditional view being served was validated against."""
+    return g.page_version
+
+
+def conditional(version_loader):
+    """Answer GET requests with 304 while the page version is unchanged.
+
+    `version_loader` is called with the view arguments and returns a tuple
+    whose first item is the last modification time of the page, or None if
+    the page does not exist. The ETag hashes the whole tuple with the
+    request path and query string, so the page is only rendered when the
+    client's copy is stale. Pages with pending flash messages are always
+    rendered, never validated and marked private. The view can read the
+    version with page_version(), to key the data it caches on it.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            version = version_loader(**kwargs)
+            if version is None:
+                abort(404)
+            g.page_version = version
+            if _pending_flashes():
+                response = make_response(view(*args, **kwargs))
+                response.cache_control.private = True
+                return response
+            etag = hashlib.sha1(repr((request.full_path, version)).encode()).hexdigest()
+            last_modified = version[0]
+
+            if request.if_none_match:
+                unchanged = request.if_none_match.contains(etag)
+            else:
+                unchanged = (last_modified is not None and request.if_modified_since is not None
+                             and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None))
+            if unchanged:
+                return _set_validators(make_response('', 304), etag, last_modified)
+            return _set_validators(make_response(view(*args, **kwargs)), etag, last_modified)
+        return wrapper
+    return decorator
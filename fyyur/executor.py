@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import create_engine
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Concurrent queries.
+#----------------------------------------------------------------------------#
+
+class QueryExecutor:
+    """Bounded thread pool running independent read queries side by side.
+
+    Each task runs in its own application context, so Flask-SQLAlchemy
+    gives it its own session, released when the task ends. DETAIL_QUERY_WORKERS
+    sets the pool size; 0 or 1 runs every task in the calling thread.
+
+    Tasks take their connections from an engine of their own, with one
+    connection per thread, never from the app's pool: a request holding a
+    connection of the app's pool never waits on that pool for its tasks,
+    so concurrent requests cannot exhaust it between them. The calling
+    thread's session is left alone, whatever its transaction holds.
+    """
+
+    def __init__(self, app=None):
+        self._pool = None
+        self._workers = 0
+        self._engine = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._workers = app.config.get('DETAIL_QUERY_WORKERS', 0)
+        if self._workers > 1:
+            self._pool = ThreadPoolExecutor(self._workers, thread_name_prefix='fyyur-query')
+        app.extensions['query_executor'] = self
+
+    def gather(self, *calls):
+        """Call each zero-argument callable and return their results in order.
+
+        The first call runs in the calling thread while the others wait for
+        a pool thread. Callables must build their queries from db.session
+        when called, not capture a query made in the calling thread.
+        """
+        if self._pool is None or len(calls) < 2 or not has_app_context():
+            return [call() for call in calls]
+        app = current_app._get_current_object()
+        engine = self._task_engine(app)
+        request_queries = g.get('request_queries')
+        futures = [self._pool.submit(self._run, app, engine, request_queries, call)
+                   for call in calls[1:]]
+        try:
+            first = calls[0]()
+        finally:
+            wait(futures)
+        return [first] + [future.result() for future in futures]
+
+    def _task_engine(self, app):
+        with self._lock:
+            if self._engine is None:
+                options = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+                if 'pool_size' in options:
+                    options.update(pool_size=self._workers, max_overflow=0)
+                self._engine = create_engine(db.engine.url, **options)
+            return self._engine
+
+    @staticmethod
+    def _run(app, engine, request_queries, call):
+        with app.app_context():
+            db.session().bind = engine
+            if request_queries is not None:
+                # Statements of the task count towards the request's profile.
+                g.request_queries = request_queries
+            return call()
+
+
+query_executor = QueryExecutor()
@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+
+import click
+from flask.cli import with_appcontext
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from models import db, GenreList, Venue, Artist, Show
+from queries import STREAM_BATCH_SIZE
+
+#----------------------------------------------------------------------------#
+# Rows.
+#----------------------------------------------------------------------------#
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def _columns(model, *names):
+    return [getattr(model, name).label(name) for name in names]
+
+
+MODELS = {
+    'venues': Venue,
+    'artists': Artist,
+    'shows': Show
+}
+
+EXPORTS = {
+    'venues': lambda: _columns(
+        Venue, 'id', 'name', 'genres', 'address', 'city', 'state', 'phone',
+        'website', 'facebook_link', 'image_link', 'seeking_talent',
+        'seeking_description', 'updated_at'),
+    'artists': lambda: _columns(
+        Artist, 'id', 'name', 'genres', 'city', 'state', 'phone', 'website',
+        'facebook_link', 'image_link', 'seeking_venue', 'seeking_description',
+        'updated_at'),
+    'shows': lambda: _columns(Show, 'id', 'venue_id') + [
+        Venue.name.label('venue_name'),
+        Show.artist_id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Show.startTime.label('start_time'),
+        Show.duration.label('duration')
+    ]
+}
+
+
+def export_rows(kind, start_id=None, end_id=None):
+    """Return (columns, rows) of `kind` with ids in [start_id, end_id).
+
+    Rows come in id order from a server-side cursor, STREAM_BATCH_SIZE at a
+    time, so an interrupted export resumes with `start_id` set past the
+    last id received.
+    """
+    columns = EXPORTS[kind]()
+    model = MODELS[kind]
+    query = db.session.query(*columns)
+    if model is Show:
+        query = query.join(Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id)
+    if start_id is not None:
+        query = query.filter(model.id >= start_id)
+    if end_id is not None:
+        query = query.filter(model.id < end_id)
+    return columns, query.order_by(model.id).yield_per(STREAM_BATCH_SIZE)
+
+#----------------------------------------------------------------------------#
+# Formats.
+#----------------------------------------------------------------------------#
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_value(value):
+    # Lists such as genres share one cell, as in the importer's CSV input.
+    return ','.join(value) if isinstance(value, list) else _value(value)
+
+
+class _Buffer(io.BytesIO):
+    """Byte sink whose contents are handed out and cleared in chunks."""
+
+    def pop(self):
+        data = self.getvalue()
+        self.seek(0)
+        self.truncate()
+        return data
+
+
+def write_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    # Sent first, so an export without rows still has its header.
+    yield buffer.getvalue()
+    rows = iter(rows)
+    while True:
+        buffer.seek(0)
+        buffer.truncate()
+        batch = list(islice(rows, STREAM_BATCH_SIZE))
+        if not batch:
+            break
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+
+
+def write_jsonl(columns, rows):
+    names = [column.name for column in columns]
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, STREAM_BATCH_SIZE))
+        if not batch:
+            break
+        yield ''.join(
+            json.dumps(dict(zip(names, map(_value, row)))) + '\n' for row in batch)
+
+
+def _arrow_type(column):
+    if isinstance(column.type, GenreList):
+        return pyarrow.list_(pyarrow.string())
+    return {
+        int: pyarrow.int64(),
+        bool: pyarrow.bool_(),
+        datetime: pyarrow.timestamp('us')
+    }.get(column.type.python_type, pyarrow.string())
+
+
+def write_parquet(columns, rows):
+    """Write one Parquet row group per STREAM_BATCH_SIZE rows.
+
+    Requires pyarrow. The file is written front to back, so each row group
+    is sent as soon as it is encoded and only the footer waits for the end.
+    """
+    schema = pyarrow.schema(
+        [(column.name, _arrow_type(column)) for column in columns])
+    sink = _Buffer()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, STREAM_BATCH_SIZE))
+        if not batch:
+            break
+        writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(zip(*batch), schema)],
+            schema=schema))
+        yield sink.pop()
+    writer.close()
+    yield sink.pop()
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'parquet': write_parquet
+}
+
+
+def export_stream(kind, format, start_id=None, end_id=None):
+    """Yield the export of `kind` in `format` as str or bytes chunks."""
+    if format == 'parquet' and pyarrow is None:
+        raise RuntimeError('Parquet export requires the pyarrow package')
+    columns, rows = export_rows(kind, start_id, end_id)
+    return WRITERS[format](columns, rows)
+
+#----------------------------------------------------------------------------#
+# Command.
+#----------------------------------------------------------------------------#
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', type=click.Choice(FORMATS), default='csv', show_default=True)
+@click.option('--output', '-o', type=click.Path(dir_okay=False, allow_dash=True), default='-',
+              help='Defaults to standard output.')
+@click.option('--start-id', type=int, help='First id to export.')
+@click.option('--end-id', type=int, help='Export ids below this one.')
+@with_appcontext
+def export_command(kind, format, output, start_id, end_id):
+    """Export venues, artists or shows as CSV, JSON lines or Parquet."""
+    try:
+        chunks = export_stream(kind, format, start_id, end_id)
+    except RuntimeError as e:
+        raise click.UsageError(str(e))
+    mode = 'wb' if format == 'parquet' else 'w'
+    with click.open_file(output, mode) as file:
+        for chunk in chunks:
+            file.write(chunk)
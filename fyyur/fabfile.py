@@ -6,9 +6,7 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest -q", capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
@@ -22,6 +20,10 @@ def push():
     local("git push origin master")
 
 
+def benchmark(output="benchmark.json"):
+    local("python benchmark.py -o {}".format(output))
+
+
 def prepare():
     test()
     commit()
@@ -39,9 +41,7 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run python -m pytest -q")
 
 
 def deploy():
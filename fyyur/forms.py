@@ -1,7 +1,9 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, IntegerField
+from wtforms.validators import DataRequired, NumberRange, URL
+
+import config
 
 class ShowForm(Form):
     artist_id = StringField(
@@ -15,6 +17,11 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default= datetime.today()
     )
+    duration = IntegerField(
+        'duration',
+        validators=[NumberRange(min=1, max=config.SHOW_MAX_DURATION)],
+        default=config.SHOW_DEFAULT_DURATION
+    )
 
 class VenueForm(Form):
     name = StringField(
@@ -123,10 +130,10 @@ class VenueForm(Form):
         'seeking_description', validators=[DataRequired()]
     )
     seeking_talent = SelectField(
-        'seeking_talent', validators=[AnyOf([True, False])],
+        'seeking_talent', validators=[DataRequired()],
         choices=[
-            (True, True),
-            (False, False),
+            ('True', 'True'),
+            ('False', 'False'),
         ]
     )
 
@@ -0,0 +1,92 @@
+from itertools import islice
+
+from flask import current_app, g
+from jinja2 import environmentfilter, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from cache import fragment_cache
+from queries import STREAM_BATCH_SIZE
+
+#----------------------------------------------------------------------------#
+# Fragment cache.
+#----------------------------------------------------------------------------#
+
+def fragment_key(key):
+    return ':'.join(map(str, key))
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja tag caching the rendered HTML of a block in the fragment cache.
+
+        {% cache 'show', show.id, show.updated_at %} ... {% endcache %}
+
+    The arguments form the key, so they must name the entity and the
+    version of everything the block displays; a block whose data changed
+    gets a new key and the old entry ages out of the store. Disabled when
+    FRAGMENT_CACHE is false.
+
+    Each block looks its key up on its own unless the loop around it reads
+    its items through the prefetch_fragments filter, which fetches the
+    entries of a whole batch of items at once:
+
+        {% for show in shows|prefetch_fragments('show', 'id', 'updated_at') %}
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.filters['prefetch_fragments'] = prefetch_fragments
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render', [nodes.List(key)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        if not current_app.config.get('FRAGMENT_CACHE', True):
+            return caller()
+        key = fragment_key(key)
+        prefetched = g.get('prefetched_fragments', {})
+        if key not in prefetched:
+            return Markup(fragment_cache.get_or_set(key, lambda: str(caller())))
+        html = prefetched.pop(key)
+        if html is None:
+            html = str(caller())
+            fragment_cache.set(key, html)
+        return Markup(html)
+
+
+@environmentfilter
+def prefetch_fragments(environment, items, name, *fields, within=None):
+    """Yield `items`, fetching the fragments keyed (name, *fields) of each batch in one call.
+
+    With `within`, the keyed items are those listed in that field of each
+    item, such as the venues of an area.
+    """
+    items = iter(items)
+    while True:
+        batch = list(islice(items, STREAM_BATCH_SIZE))
+        if not batch:
+            return
+        if current_app.config.get('FRAGMENT_CACHE', True):
+            keyed = batch
+            if within:
+                keyed = [child for item in batch for child in environment.getattr(item, within)]
+            keys = [fragment_key([name] + [environment.getattr(item, field) for field in fields])
+                    for item in keyed]
+            prefetched = dict.fromkeys(keys)
+            prefetched.update(fragment_cache.get_many(keys))
+            g.prefetched_fragments = prefetched
+        yield from batch
+
+
+def init_app(app):
+    fragment_cache.init_app(app)
+    app.jinja_env.add_extension(FragmentCacheExtension)
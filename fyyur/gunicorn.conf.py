@@ -0,0 +1,38 @@
+import importlib.util
+import multiprocessing
+import os
+
+#----------------------------------------------------------------------------#
+# Gunicorn settings, read by `gunicorn app:app`.
+#----------------------------------------------------------------------------#
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# 'sync' workers serve one request at a time. 'gevent' workers serve up to
+# worker_connections requests each, switching to another request whenever
+# one waits on PostgreSQL; raise DB_POOL_SIZE to match.
+worker_class = os.environ.get('WORKER_CLASS', 'sync')
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 100))
+
+# Sync workers fork from a master that already imported the app and
+# compiled its templates (TEMPLATE_WARMUP). gevent must patch the standard
+# library before the app is imported, so its workers load the app themselves.
+preload_app = worker_class == 'sync'
+
+if worker_class == 'gevent':
+    missing = [name for name in ('gevent', 'psycogreen') if importlib.util.find_spec(name) is None]
+    if missing:
+        raise SystemExit('WORKER_CLASS=gevent needs {}: pip install -r requirements-gunicorn.txt'.format(
+            ' and '.join(missing)))
+    # Each request already has its own greenlet; detail queries handed to
+    # a thread pool would only queue behind those of the other requests.
+    os.environ['DETAIL_QUERY_WORKERS'] = '0'
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 blocks the whole process while it waits for the server
+        # unless it is told to yield to the gevent hub.
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
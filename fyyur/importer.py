@@ -0,0 +1,335 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.datastructures import MultiDict
+
+from bookings import BookingIndex, booking
+from cache import cache, venue_key, artist_key
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show
+from queries import bookings, forget_show_summaries, touch
+from search import venue_search, artist_search
+
+#----------------------------------------------------------------------------#
+# Rows.
+#----------------------------------------------------------------------------#
+
+FORMATS = ('csv', 'jsonl')
+
+
+def read_rows(stream, format):
+    """Yield (line number, dict) for each record of a text stream.
+
+    CSV files need a header row; multi-valued columns such as genres are
+    separated by commas inside their cell. JSON-lines records may give them
+    as lists. Blank lines are skipped.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if 'genres' in row and row['genres'] is not None:
+                row['genres'] = [genre.strip() for genre in row['genres'].split(',') if genre.strip()]
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line_num, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    yield line_num, json.loads(line)
+                except ValueError as e:
+                    yield line_num, e
+    else:
+        raise ValueError('Unknown import format %r' % format)
+
+
+def guess_format(filename):
+    extension = os.path.splitext(filename or '')[1].lstrip('.').lower()
+    return 'jsonl' if extension in ('jsonl', 'ndjson', 'json') else 'csv'
+
+
+def _formdata(row):
+    formdata = MultiDict()
+    for key, value in row.items():
+        for item in value if isinstance(value, list) else [value]:
+            if item is not None:
+                formdata.add(key, str(item))
+    return formdata
+
+#----------------------------------------------------------------------------#
+# Importers.
+#----------------------------------------------------------------------------#
+
+class ImportReport:
+    """Outcome of one import: counts plus the first errors of each kind."""
+
+    def __init__(self, max_errors=100):
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.errors = []
+        self.batch_errors = []
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "errors": errors})
+
+    def fail_batch(self, first_line, last_line, size, error):
+        self.failed += size
+        self.batch_errors.append({
+            "first_line": first_line,
+            "last_line": last_line,
+            "rows": size,
+            "error": str(error).splitlines()[0]
+        })
+
+    def as_dict(self):
+        return {
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "errors": self.errors,
+            "batch_errors": self.batch_errors
+        }
+
+
+class Importer:
+    """Validate rows with a form and insert them in batches.
+
+    Each row is checked with the same form as the web pages, reusing a
+    single form instance. Valid rows are inserted with one executemany per
+    batch, committed separately, so a failing batch is rolled back and
+    reported without losing the batches before or after it.
+    """
+
+    form_class = None
+    model = None
+
+    def __init__(self, batch_size=1000, max_errors=100):
+        self.batch_size = batch_size
+        self.report = ImportReport(max_errors)
+        self.form = self.form_class(formdata=None, meta={'csrf': False})
+
+    def validate(self, row):
+        """Return (values, None) for a valid row, or (None, errors)."""
+        self.form.process(_formdata(row))
+        if not self.form.validate():
+            return None, self.form.errors
+        return self.values(self.form), None
+
+    def values(self, form):
+        return {
+            name: field.data for name, field in form._fields.items()
+            if name in self.model.__table__.columns
+        }
+
+    def run(self, rows):
+        """Import (line number, row) pairs and return the ImportReport."""
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.batch_size))
+            if not chunk:
+                break
+            self.prepare(chunk)
+            batch = []
+            for line, row in chunk:
+                if isinstance(row, Exception):
+                    self.report.reject(line, {"row": [str(row)]})
+                    continue
+                values, errors = self.validate(row)
+                if errors:
+                    self.report.reject(line, errors)
+                else:
+                    batch.append(values)
+            if batch:
+                self.insert(batch, chunk[0][0], chunk[-1][0])
+        self.finish()
+        return self.report
+
+    def insert(self, batch, first_line, last_line):
+        """Insert and commit a batch of values; return whether it succeeded."""
+        try:
+            db.session.execute(self.model.__table__.insert(), batch)
+            self.after_insert(batch)
+            db.session.commit()
+            self.report.inserted += len(batch)
+            return True
+        except Exception as e:
+            db.session.rollback()
+            self.report.fail_batch(first_line, last_line, len(batch), e)
+            return False
+
+    def prepare(self, chunk):
+        """Called with each chunk of (line number, row) pairs before it is validated."""
+
+    def after_insert(self, batch):
+        pass
+
+    def finish(self):
+        pass
+
+
+class VenueImporter(Importer):
+    form_class = VenueForm
+    model = Venue
+
+    def values(self, form):
+        values = super().values(form)
+        values['seeking_talent'] = values['seeking_talent'] == 'True'
+        return values
+
+    def finish(self):
+        venue_search.invalidate()
+
+
+class ArtistImporter(Importer):
+    form_class = ArtistForm
+    model = Artist
+
+    def values(self, form):
+        values = super().values(form)
+        values['seeking_venue'] = values['seeking_venue'] == 'True'
+        return values
+
+    def finish(self):
+        artist_search.invalidate()
+
+
+class ShowImporter(Importer):
+    """Shows refer to existing venues and artists by id.
+
+    The ids are loaded once so that rows pointing at missing venues or
+    artists are rejected individually instead of failing their batch.
+    Likewise rows booking a venue or artist already taken at that time,
+    by an existing show or an earlier row, are rejected: the bookings of
+    the venues and artists of each chunk are loaded into a BookingIndex
+    the first time they appear, and accepted rows are added to it.
+    """
+
+    form_class = ShowForm
+    model = Show
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.venue_ids = {id for id, in db.session.query(Venue.id)}
+        self.artist_ids = {id for id, in db.session.query(Artist.id)}
+        self.bookings = BookingIndex()
+
+    def prepare(self, chunk):
+        for name, key, known in (('venue_id', Show.venue_id, self.venue_ids),
+                                 ('artist_id', Show.artist_id, self.artist_ids)):
+            ids = set()
+            for _, row in chunk:
+                try:
+                    id = int(row.get(name))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+                if id in known and (name, id) not in self.bookings:
+                    ids.add(id)
+            shows = {id: [] for id in ids}
+            for show in bookings(key, ids) if ids else []:
+                shows[getattr(show, name)].append(booking(show.startTime, show.duration, show.id))
+            for id, booked in shows.items():
+                self.bookings.load((name, id), booked)
+
+    def validate(self, row):
+        if row.get('duration') == '':
+            # A blank CSV cell means the default duration.
+            row = dict(row, duration=None)
+        values, errors = super().validate(row)
+        if errors:
+            return values, errors
+        errors = {}
+        if not row.get('start_time'):
+            # The form falls back to the current time when it is missing.
+            errors['start_time'] = ['This field is required.']
+        for name, ids in (('venue_id', self.venue_ids), ('artist_id', self.artist_ids)):
+            try:
+                values[name] = int(values[name])
+            except (TypeError, ValueError):
+                errors[name] = ['Not a valid id.']
+                continue
+            if values[name] not in ids:
+                errors[name] = ['No such %s.' % name[:-3]]
+        if errors:
+            return None, errors
+        booked = booking(values['startTime'], values['duration'])
+        for name in ('venue_id', 'artist_id'):
+            conflicts = self.bookings.conflicts((name, values[name]), booked.start, booked.end)
+            if conflicts:
+                errors[name] = ['Already booked from %s to %s.' % (
+                    conflicts[0].start.isoformat(' '), conflicts[0].end.isoformat(' '))]
+        if errors:
+            return None, errors
+        self.bookings.add(('venue_id', values['venue_id']), booked)
+        self.bookings.add(('artist_id', values['artist_id']), booked)
+        return values, None
+
+    def values(self, form):
+        return {
+            "venue_id": form.venue_id.data,
+            "artist_id": form.artist_id.data,
+            "startTime": form.start_time.data,
+            "duration": form.duration.data
+        }
+
+    def insert(self, batch, first_line, last_line):
+        if not super().insert(batch, first_line, last_line):
+            # The rolled back shows no longer hold their times.
+            for values in batch:
+                booked = booking(values['startTime'], values['duration'])
+                self.bookings.remove(('venue_id', values['venue_id']), booked)
+                self.bookings.remove(('artist_id', values['artist_id']), booked)
+
+    def after_insert(self, batch):
+        venue_ids = {values['venue_id'] for values in batch}
+        artist_ids = {values['artist_id'] for values in batch}
+        touch(Venue, venue_ids)
+        touch(Artist, artist_ids)
+        forget_show_summaries(Show.venue_id, venue_ids)
+        forget_show_summaries(Show.artist_id, artist_ids)
+        cache.delete(*map(venue_key, venue_ids), *map(artist_key, artist_ids))
+
+
+IMPORTERS = {
+    'venues': VenueImporter,
+    'artists': ArtistImporter,
+    'shows': ShowImporter
+}
+
+
+def import_stream(kind, stream, format, batch_size=None):
+    """Import a text stream of `kind` rows and return the ImportReport."""
+    importer = IMPORTERS[kind](
+        batch_size or current_app.config['IMPORT_BATCH_SIZE'],
+        current_app.config['IMPORT_MAX_ERRORS'])
+    return importer.run(read_rows(stream, format))
+
+#----------------------------------------------------------------------------#
+# Command.
+#----------------------------------------------------------------------------#
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('file', type=click.File('r', encoding='utf-8'))
+@click.option('--format', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', type=int, help='Rows per insert; defaults to IMPORT_BATCH_SIZE.')
+@with_appcontext
+def import_command(kind, file, format, batch_size):
+    """Import venues, artists or shows from a CSV or JSON-lines file."""
+    report = import_stream(kind, file, format or guess_format(file.name), batch_size)
+    click.echo(json.dumps(report.as_dict(), indent=2))
+    if report.rejected or report.failed:
+        raise SystemExit(1)
+
+
+def import_upload(kind, file, format=None):
+    """Import an uploaded werkzeug FileStorage without reading it into memory."""
+    stream = io.TextIOWrapper(file.stream, encoding='utf-8', newline='')
+    return import_stream(kind, stream, format or guess_format(file.filename))
@@ -0,0 +1,41 @@
+"""search indexes on venue and artist
+
+Revision ID: 3b1f0c9a7d42
+Revises: 17f8ed12a646
+Create Date: 2026-10-18 09:12:41.203518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f0c9a7d42'
+down_revision = '17f8ed12a646'
+branch_labels = None
+depends_on = None
+
+
+# Must stay identical to search.DOCUMENT_SQL.
+DOCUMENT_SQL = (
+    "to_tsvector('simple', "
+    "coalesce({table}.name, '') || ' ' || "
+    "coalesce({table}.city, '') || ' ' || "
+    "coalesce({table}.state, '') || ' ' || "
+    "coalesce({table}.genres, ''))"
+)
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('venue', 'artist'):
+        op.execute('CREATE INDEX ix_{table}_search_document ON {table} USING gin (({document}))'.format(
+            table=table, document=DOCUMENT_SQL.format(table=table)))
+        op.execute('CREATE INDEX ix_{table}_name_trgm ON {table} USING gin (name gin_trgm_ops)'.format(
+            table=table))
+
+
+def downgrade():
+    for table in ('venue', 'artist'):
+        op.drop_index('ix_{}_name_trgm'.format(table), table_name=table)
+        op.drop_index('ix_{}_search_document'.format(table), table_name=table)
@@ -0,0 +1,34 @@
+"""indexes for show lookups and the listings
+
+Revision ID: 8c4d2e61b7a9
+Revises: 3b1f0c9a7d42
+Create Date: 2026-10-18 10:02:17.554120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2e61b7a9'
+down_revision = '3b1f0c9a7d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_show_venue_id_startTime', 'show', ['venue_id', 'startTime'])
+    op.create_index('ix_show_artist_id_startTime', 'show', ['artist_id', 'startTime'])
+    op.create_index('ix_show_startTime', 'show', ['startTime'])
+    op.create_index('ix_venue_city_state_name', 'venue', ['city', 'state', sa.text('lower(name)')])
+    op.create_index('ix_venue_lower_name', 'venue', [sa.text('lower(name)')])
+    op.create_index('ix_artist_lower_name', 'artist', [sa.text('lower(name)')])
+
+
+def downgrade():
+    op.drop_index('ix_artist_lower_name', table_name='artist')
+    op.drop_index('ix_venue_lower_name', table_name='venue')
+    op.drop_index('ix_venue_city_state_name', table_name='venue')
+    op.drop_index('ix_show_startTime', table_name='show')
+    op.drop_index('ix_show_artist_id_startTime', table_name='show')
+    op.drop_index('ix_show_venue_id_startTime', table_name='show')
@@ -0,0 +1,27 @@
+"""updated_at on venue and artist
+
+Revision ID: a57e9d03c1f8
+Revises: 8c4d2e61b7a9
+Create Date: 2026-10-18 11:20:54.918374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a57e9d03c1f8'
+down_revision = '8c4d2e61b7a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                       server_default=sa.text("timezone('utc', now())")))
+
+
+def downgrade():
+    op.drop_column('artist', 'updated_at')
+    op.drop_column('venue', 'updated_at')
@@ -0,0 +1,33 @@
+"""indexed page versions: updated_at indexes and deletion counters
+
+Revision ID: b7d3e9f2a4c6
+Revises: f2c6a8d4b1e7
+Create Date: 2026-10-18 19:52:37.201845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e9f2a4c6'
+down_revision = 'f2c6a8d4b1e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('deletion',
+    sa.Column('name', sa.String(length=20), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index('ix_venue_updated_at', 'venue', ['updated_at'])
+    op.create_index('ix_artist_updated_at', 'artist', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_artist_updated_at', table_name='artist')
+    op.drop_index('ix_venue_updated_at', table_name='venue')
+    op.drop_table('deletion')
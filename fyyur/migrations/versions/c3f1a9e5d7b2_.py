@@ -0,0 +1,31 @@
+"""cascade deletes from venue and artist to show
+
+Revision ID: c3f1a9e5d7b2
+Revises: a57e9d03c1f8
+Create Date: 2026-10-18 14:02:37.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1a9e5d7b2'
+down_revision = 'a57e9d03c1f8'
+branch_labels = None
+depends_on = None
+
+
+def _replace_foreign_keys(ondelete):
+    for column, table in (('venue_id', 'venue'), ('artist_id', 'artist')):
+        name = 'show_%s_fkey' % column
+        op.drop_constraint(name, 'show', type_='foreignkey')
+        op.create_foreign_key(name, 'show', table, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
@@ -0,0 +1,70 @@
+"""genres as text[] with GIN indexes
+
+Revision ID: d8b4e2f1a6c3
+Revises: c3f1a9e5d7b2
+Create Date: 2026-10-18 16:45:12.530921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b4e2f1a6c3'
+down_revision = 'c3f1a9e5d7b2'
+branch_labels = None
+depends_on = None
+
+
+# Must stay identical to search.DOCUMENT_SQL.
+DOCUMENT_SQL = (
+    "to_tsvector('simple', "
+    "coalesce({table}.name, '') || ' ' || "
+    "coalesce({table}.city, '') || ' ' || "
+    "coalesce({table}.state, '') || ' ' || "
+    "genres_text({table}.genres))"
+)
+
+# The search document of migration 3b1f0c9a7d42.
+OLD_DOCUMENT_SQL = (
+    "to_tsvector('simple', "
+    "coalesce({table}.name, '') || ' ' || "
+    "coalesce({table}.city, '') || ' ' || "
+    "coalesce({table}.state, '') || ' ' || "
+    "coalesce({table}.genres, ''))"
+)
+
+# Rows written through psycopg2 hold array literals such as '{Jazz,Blues}',
+# others comma-separated names. `flask backfill-genres` trims and
+# deduplicates the converted values.
+TO_ARRAY_SQL = (
+    "CASE WHEN genres IS NULL OR genres = '' THEN '{}'::text[] "
+    "WHEN genres LIKE '{%}' THEN genres::text[] "
+    "ELSE string_to_array(genres, ',') END"
+)
+
+
+def upgrade():
+    # array_to_string() is only STABLE, which index expressions reject.
+    op.execute(
+        "CREATE FUNCTION genres_text(text[]) RETURNS text "
+        "LANGUAGE sql IMMUTABLE AS $$ SELECT coalesce(array_to_string($1, ' '), '') $$")
+    for table in ('venue', 'artist'):
+        op.drop_index('ix_{}_search_document'.format(table), table_name=table)
+        op.alter_column(table, 'genres', type_=postgresql.ARRAY(sa.Text()),
+                        postgresql_using=TO_ARRAY_SQL)
+        op.execute('CREATE INDEX ix_{table}_search_document ON {table} USING gin (({document}))'.format(
+            table=table, document=DOCUMENT_SQL.format(table=table)))
+        op.create_index('ix_{}_genres'.format(table), table, ['genres'], postgresql_using='gin')
+
+
+def downgrade():
+    for table, length in (('venue', None), ('artist', 120)):
+        op.drop_index('ix_{}_genres'.format(table), table_name=table)
+        op.drop_index('ix_{}_search_document'.format(table), table_name=table)
+        op.alter_column(table, 'genres', type_=sa.String(length=length),
+                        postgresql_using="array_to_string(genres, ',')")
+        op.execute('CREATE INDEX ix_{table}_search_document ON {table} USING gin (({document}))'.format(
+            table=table, document=OLD_DOCUMENT_SQL.format(table=table)))
+    op.execute('DROP FUNCTION genres_text(text[])')
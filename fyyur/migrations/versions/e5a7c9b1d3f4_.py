@@ -0,0 +1,35 @@
+"""show summary tables
+
+Revision ID: e5a7c9b1d3f4
+Revises: d8b4e2f1a6c3
+Create Date: 2026-10-18 18:20:41.207356
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9b1d3f4'
+down_revision = 'd8b4e2f1a6c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask refresh-show-summary`; until then counts fall back to
+    # the show table.
+    for table in ('venue', 'artist'):
+        op.create_table('{}_show_summary'.format(table),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('upcoming_count', sa.Integer(), nullable=False),
+        sa.Column('next_show_time', sa.DateTime(), nullable=True),
+        sa.Column('total_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['id'], ['{}.id'.format(table)], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('artist_show_summary')
+    op.drop_table('venue_show_summary')
@@ -0,0 +1,73 @@
+"""show durations and double-booking exclusion constraints
+
+Revision ID: f2c6a8d4b1e7
+Revises: e5a7c9b1d3f4
+Create Date: 2026-10-18 19:30:08.614392
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a8d4b1e7'
+down_revision = 'e5a7c9b1d3f4'
+branch_labels = None
+depends_on = None
+
+
+# Must stay identical to models.SHOW_PERIOD_SQL.
+SHOW_PERIOD_SQL = 'tsrange("startTime", "startTime" + duration * interval \'1 minute\')'
+
+# config.SHOW_DEFAULT_DURATION when this migration was written.
+SHOW_DEFAULT_DURATION = 120
+
+# Upcoming shows get the default duration, cut short where it would run
+# into the next upcoming show of the same venue or artist.
+UPCOMING_DURATIONS_SQL = """
+UPDATE show SET duration = upcoming.duration FROM (
+    SELECT id, least(
+        {default},
+        coalesce(floor(extract(epoch FROM lead("startTime") OVER (
+            PARTITION BY venue_id ORDER BY "startTime", id) - "startTime") / 60), {default}),
+        coalesce(floor(extract(epoch FROM lead("startTime") OVER (
+            PARTITION BY artist_id ORDER BY "startTime", id) - "startTime") / 60), {default})
+    ) AS duration
+    FROM show
+    WHERE "startTime" > now()
+) AS upcoming
+WHERE show.id = upcoming.id
+""".format(default=SHOW_DEFAULT_DURATION)
+
+
+def upgrade():
+    # Past shows have no known length. As 0-minute shows they are empty
+    # ranges, so past double-bookings cannot make the constraints fail.
+    # Upcoming shows must keep holding their venue and artist.
+    op.add_column('show', sa.Column('duration', sa.Integer(), nullable=False, server_default='0'))
+    op.alter_column('show', 'duration', server_default=str(SHOW_DEFAULT_DURATION))
+    op.execute(UPCOMING_DURATIONS_SQL)
+    shortened = op.get_bind().execute(
+        'SELECT id, duration FROM show WHERE "startTime" > now() AND duration < %d ORDER BY id'
+        % SHOW_DEFAULT_DURATION).fetchall()
+    if shortened:
+        # Overlapping upcoming bookings: each ends when the next one starts,
+        # and shows starting together with another get 0 minutes.
+        logging.getLogger('alembic').warning(
+            'Upcoming shows double-booked with the next show of their venue or artist, '
+            'shortened to end before it (id: minutes): %s',
+            ', '.join('%d: %d' % (id, duration) for id, duration in shortened))
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for column in ('venue_id', 'artist_id'):
+        op.execute(
+            'ALTER TABLE show ADD CONSTRAINT show_{column}_no_overlap '
+            'EXCLUDE USING gist ({column} WITH =, {period} WITH &&)'.format(
+                column=column, period=SHOW_PERIOD_SQL))
+
+
+def downgrade():
+    for column in ('artist_id', 'venue_id'):
+        op.drop_constraint('show_{}_no_overlap'.format(column), 'show')
+    op.drop_column('show', 'duration')
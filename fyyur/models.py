@@ -1,27 +1,91 @@
+import csv
+import json
+from datetime import datetime, timedelta
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event, func
+from sqlalchemy.dialects import postgresql
+
+import config
 
 db = SQLAlchemy()
 
+
+def parse_genres(value):
+    """Return the genre names of a list or of a legacy genres string.
+
+    Strings may hold a JSON list, a PostgreSQL array literal such as
+    '{Jazz,"Rock n Roll"}' or comma-separated names.
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('['):
+            return parse_genres(json.loads(value))
+        if value.startswith('{') and value.endswith('}'):
+            value = value[1:-1]
+        value = next(csv.reader([value], skipinitialspace=True), [])
+    return [genre.strip() for genre in value if genre and genre.strip()]
+
+
+
+class GenreList(db.TypeDecorator):
+    """List of genre names: a GIN-indexable text[] on PostgreSQL, JSON text elsewhere."""
+
+    impl = db.Text
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.ARRAY(db.Text))
+        return dialect.type_descriptor(db.Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = parse_genres(value)
+        return value if dialect.name == 'postgresql' else json.dumps(value)
+
+    def process_result_value(self, value, dialect):
+        return parse_genres(value)
+
+
+
 class Show(db.Model):
     __tablename__ = 'show'    
     id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), nullable=False)
     startTime = db.Column(db.DateTime, nullable=False)
+    # Minutes; 0 for shows booked before durations were recorded.
+    duration = db.Column(db.Integer, nullable=False, default=config.SHOW_DEFAULT_DURATION,
+                         server_default=str(config.SHOW_DEFAULT_DURATION))
+
+    venue = db.relationship('Venue', back_populates='shows')
+    artist = db.relationship('Artist', back_populates='shows')
 
-    venue = db.relationship('Venue', backref=db.backref('venues'))
-    artist = db.relationship('Artist', backref=db.backref('artists'))
+    __table_args__ = (
+        db.Index('ix_show_venue_id_startTime', 'venue_id', 'startTime'),
+        db.Index('ix_show_artist_id_startTime', 'artist_id', 'startTime'),
+        db.Index('ix_show_startTime', 'startTime'),
+    )
+
+
+    @property
+    def end_time(self):
+        return self.startTime + timedelta(minutes=self.duration)
 
     def __repr__(self):
       return f'<id: {self.id} venue_id: {self.venue_id} artist_id: {self.artist_id} startTime:{self.startTime}>'
 
 
+
 class Venue(db.Model):
     __tablename__ = 'venue'
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
-    genres = db.Column(db.String)
+    genres = db.Column(GenreList)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False )
     address = db.Column(db.String(120), nullable=False )
@@ -31,8 +95,15 @@ class Venue(db.Model):
     website = db.Column(db.String)
     seeking_talent = db.Column(db.Boolean, nullable=False, default=True)
     seeking_description = db.Column(db.String)
+    # Version of the entity's pages, bumped on every change that alters them.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    shows = db.relationship('Show', backref=db.backref('venues'), lazy="joined")
+    # Queries that need the shows choose their own strategy with loader
+    # options; see config.SHOWS_LOADING for the default.
+    # Shows go with their venue through ON DELETE CASCADE; the ORM does not
+    # load them to delete them one by one.
+    shows = db.relationship('Show', back_populates='venue', lazy=config.SHOWS_LOADING,
+                            passive_deletes=True)
 
     def __repr__(self):
       return f'<id: {self.id} name: {self.name}>'
@@ -45,14 +116,116 @@ class Artist(db.Model):
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.String(120))
+    genres = db.Column(GenreList)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String)
     seeking_venue = db.Column(db.Boolean, nullable=False, default=True)
     seeking_description = db.Column(db.String)
+    # Version of the entity's pages, bumped on every change that alters them.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    shows = db.relationship('Show', back_populates='artist', lazy=config.SHOWS_LOADING,
+                            passive_deletes=True)
+
 
-    shows = db.relationship('Show', backref=db.backref('artists'), lazy="joined")
 
     def __repr__(self):
-      return f'<id: {self.id} name: {self.name}>'
\ No newline at end of file
+      return f'<id: {self.id} name: {self.name}>'
+
+class ShowSummaryMixin:
+    """Show counts of one venue or artist, as of the last refresh.
+
+    Kept by queries.record_show and `flask refresh-show-summary`; the row is
+    stale once next_show_time has passed.
+    """
+
+    upcoming_count = db.Column(db.Integer, nullable=False, default=0)
+    next_show_time = db.Column(db.DateTime)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class VenueShowSummary(ShowSummaryMixin, db.Model):
+    __tablename__ = 'venue_show_summary'
+
+    id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), primary_key=True)
+
+
+class ArtistShowSummary(ShowSummaryMixin, db.Model):
+    __tablename__ = 'artist_show_summary'
+
+    id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), primary_key=True)
+
+
+class Deletion(db.Model):
+    """Number and time of the deletions of venues or of artists.
+
+    Page versions are read from indexed maxima such as max(updated_at),
+    which a deletion cannot move, so each deletion bumps its row here.
+    """
+    __tablename__ = 'deletion'
+
+    name = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    deleted_at = db.Column(db.DateTime, nullable=False)
+
+# Expression indexes used by the listings (see migration 8c4d2e61b7a9).
+
+db.Index('ix_venue_city_state_name', Venue.city, Venue.state, func.lower(Venue.name))
+db.Index('ix_venue_lower_name', func.lower(Venue.name))
+db.Index('ix_artist_lower_name', func.lower(Artist.name))
+# Page versions (see migration b7d3e9f2a4c6).
+db.Index('ix_venue_updated_at', Venue.updated_at)
+db.Index('ix_artist_updated_at', Artist.updated_at)
+
+# Genre filters (see migration d8b4e2f1a6c3).
+db.Index('ix_venue_genres', Venue.genres, postgresql_using='gin')
+db.Index('ix_artist_genres', Artist.genres, postgresql_using='gin')
+
+# Ranked search on PostgreSQL (see migrations 3b1f0c9a7d42 and
+# d8b4e2f1a6c3): a GIN index on the search document and a trigram index
+# on the name, created with what they need so create_all() builds them
+# too. DOCUMENT_SQL must stay identical to the indexed expression, or
+# the search queries cannot use it.
+DOCUMENT_SQL = (
+    "to_tsvector('simple', "
+    "coalesce({table}.name, '') || ' ' || "
+    "coalesce({table}.city, '') || ' ' || "
+    "coalesce({table}.state, '') || ' ' || "
+    "genres_text({table}.genres))"
+)
+
+# array_to_string() is only STABLE, which index expressions reject.
+GENRES_TEXT_SQL = (
+    "CREATE OR REPLACE FUNCTION genres_text(text[]) RETURNS text "
+    "LANGUAGE sql IMMUTABLE AS $$ SELECT coalesce(array_to_string($1, ' '), '') $$"
+)
+
+for table in (Venue.__table__, Artist.__table__):
+    for statement in (
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            GENRES_TEXT_SQL,
+            'CREATE INDEX ix_{table}_search_document ON {table} USING gin (({document}))'.format(
+                table=table.name, document=DOCUMENT_SQL.format(table=table.name)),
+            'CREATE INDEX ix_{table}_name_trgm ON {table} USING gin (name gin_trgm_ops)'.format(
+                table=table.name)):
+        event.listen(table, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+
+# No venue or artist holds two overlapping shows (see migration
+# f2c6a8d4b1e7, which also installs the btree_gist extension). Shows of
+# length 0 are empty ranges and overlap nothing.
+SHOW_PERIOD_SQL = 'tsrange("startTime", "startTime" + duration * interval \'1 minute\')'
+
+event.listen(Show.__table__, 'after_create', DDL(
+    'CREATE EXTENSION IF NOT EXISTS btree_gist'
+).execute_if(dialect='postgresql'))
+for column in ('venue_id', 'artist_id'):
+    event.listen(Show.__table__, 'after_create', DDL(
+
+        'ALTER TABLE show ADD CONSTRAINT show_{column}_no_overlap '
+        'EXCLUDE USING gist ({column} WITH =, {period} WITH &&)'.format(
+            column=column, period=SHOW_PERIOD_SQL)
+    ).execute_if(dialect='postgresql'))
+
+
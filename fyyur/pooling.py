@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+#----------------------------------------------------------------------------#
+# Pool metrics.
+#----------------------------------------------------------------------------#
+
+class PoolMetrics:
+    """Checkout latency of the connection pool, kept for the whole process."""
+
+    def __init__(self, window=1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._recent.append(wait)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def summary(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            checkouts, timeouts = self.checkouts, self.timeouts
+            total_wait, max_wait = self.total_wait, self.max_wait
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_ms_avg": round(total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+            "wait_ms_p95": round(recent[int(len(recent) * 0.95)] * 1000, 3) if recent else 0.0,
+            "wait_ms_max": round(max_wait * 1000, 3)
+        }
+
+
+metrics = PoolMetrics()
+
+
+class _TimedCheckout:
+    """Pool mixin recording how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.record_timeout()
+            raise
+        finally:
+            metrics.record(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckout, NullPool):
+    pass
+
+#----------------------------------------------------------------------------#
+# Engine configuration.
+#----------------------------------------------------------------------------#
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings of config.py.
+
+    SQLite keeps Flask-SQLAlchemy's defaults. With DB_PGBOUNCER the app
+    keeps no connections of its own and leaves pooling to PgBouncer, which
+    also rejects the startup options used to set statement_timeout.
+    """
+    if config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return {}
+    options = {"pool_pre_ping": config['DB_POOL_PRE_PING']}
+    if config['SQLALCHEMY_DATABASE_URI'].startswith('postgres'):
+        # Send executemany() batches, such as those of the importer, as
+        # multi-row INSERT ... VALUES statements.
+        options["executemany_mode"] = 'values'
+    if config['DB_PGBOUNCER']:
+        options["poolclass"] = InstrumentedNullPool
+        return options
+    options.update({
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config['DB_POOL_SIZE'],
+        "max_overflow": config['DB_MAX_OVERFLOW'],
+        "pool_timeout": config['DB_POOL_TIMEOUT'],
+        "pool_recycle": config['DB_POOL_RECYCLE']
+    })
+    if config['DB_STATEMENT_TIMEOUT_MS']:
+        options["connect_args"] = {
+            "options": "-c statement_timeout=%d" % config['DB_STATEMENT_TIMEOUT_MS']
+        }
+    return options
+
+
+def init_app(app):
+    options = engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def pool_stats(engine):
+    """Return the current pool occupancy and checkout latency."""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity else 0.0
+        })
+    stats.update(metrics.summary())
+    return stats
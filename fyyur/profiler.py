@@ -0,0 +1,112 @@
+import json
+import time
+from collections import Counter, deque
+
+from flask import g, has_app_context, render_template, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Query profiler.
+#----------------------------------------------------------------------------#
+
+class RequestQueries:
+    """Statements executed while serving one request."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.statements = []
+
+    def record(self, statement, duration):
+        self.statements.append((statement, duration))
+
+    def summary(self, slowest=5):
+        counts = Counter(statement for statement, _ in self.statements)
+        ranked = sorted(self.statements, key=lambda item: item[1], reverse=True)
+        return {
+            "method": self.method,
+            "path": self.path,
+            "count": len(self.statements),
+            "total_ms": round(sum(duration for _, duration in self.statements) * 1000, 3),
+            "slowest": [{"statement": statement, "ms": round(duration * 1000, 3)}
+                        for statement, duration in ranked[:slowest]],
+            "duplicates": [{"statement": statement, "count": count}
+                           for statement, count in counts.most_common() if count > 1]
+        }
+
+
+class QueryProfiler:
+    """Per-request SQL statement counter hooked into SQLAlchemy engine events.
+
+    When QUERY_PROFILER is enabled every response carries X-DB-Query-Count,
+    X-DB-Time-Ms and X-DB-Duplicate-Queries headers, a JSON summary is
+    logged for each request and, with QUERY_PROFILER_PANEL only, the most
+    recent summaries are listed at /debug/queries. Headers of streamed
+    responses only cover the statements run before streaming started; the
+    log line covers the whole request.
+    """
+
+    def __init__(self, app=None):
+        self.recent = deque(maxlen=50)
+        self.slowest = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('QUERY_PROFILER', False):
+            return
+        self.recent = deque(maxlen=app.config.get('QUERY_PROFILER_HISTORY', 50))
+        self.slowest = app.config.get('QUERY_PROFILER_SLOWEST', 5)
+        self.logger = app.logger
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if app.config.get('QUERY_PROFILER_PANEL', False):
+            # Raw statements and other users' URLs; never in production.
+            app.add_url_rule('/debug/queries', 'debug_queries', self.panel)
+        app.extensions['query_profiler'] = self
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['query_start_time'].pop()
+        if has_app_context() and 'request_queries' in g:
+            g.request_queries.record(statement, duration)
+
+    def _handle_error(self, context):
+        # A failed statement never reaches after_cursor_execute.
+        starts = context.connection.info.get('query_start_time') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    def _start_request(self):
+        g.request_queries = RequestQueries(request.method, request.full_path.rstrip('?'))
+
+    def _finish_request(self, response):
+        queries = g.get('request_queries')
+        if queries is None or request.endpoint == 'debug_queries':
+            return response
+        summary = queries.summary(self.slowest)
+        response.headers['X-DB-Query-Count'] = str(summary['count'])
+        response.headers['X-DB-Time-Ms'] = str(summary['total_ms'])
+        response.headers['X-DB-Duplicate-Queries'] = str(
+            sum(duplicate['count'] - 1 for duplicate in summary['duplicates']))
+        # Streamed pages keep querying after the headers are sent, so the
+        # log line and the panel wait until the body has been written.
+        response.call_on_close(lambda: self._log(queries))
+        return response
+
+    def _log(self, queries):
+        summary = queries.summary(self.slowest)
+        self.logger.info('db_queries %s', json.dumps(summary))
+        self.recent.appendleft(summary)
+
+    def panel(self):
+        return render_template('pages/debug_queries.html', requests=list(self.recent))
+
+
+profiler = QueryProfiler()
@@ -0,0 +1,697 @@
+import base64
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from itertools import groupby, islice
+
+from sqlalchemy import Text, case, func, or_, tuple_, type_coerce
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import noload
+
+import config
+from bookings import booking
+from executor import query_executor
+from models import db, Deletion, Show, Artist, Venue, VenueShowSummary, ArtistShowSummary
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+# Rows fetched per round trip when a listing is streamed unpaged.
+STREAM_BATCH_SIZE = 500
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    values = [value.isoformat() if isinstance(value, datetime) else value
+              for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, *types):
+    """Decode a cursor produced by encode_cursor.
+
+    `types` converts each position back to its column type. Raises
+    ValueError for cursors that were not produced by encode_cursor.
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError('Wrong number of cursor values')
+        return [kind(value) for kind, value in zip(types, values)]
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Malformed cursor')
+
+
+def keyset_page(query, order_by, after, limit, descending=False):
+    """Return (rows, next_cursor) for one page of `query`.
+
+    Rows are sought past the decoded `after` values with a row-value
+    comparison on `order_by`, so the database walks the matching index from
+    the cursor instead of scanning and discarding an OFFSET. The selected
+    columns must end with the `order_by` values.
+
+    A `limit` of 0 disables paging: rows are then streamed from a
+    server-side cursor in batches of STREAM_BATCH_SIZE.
+    """
+    if after is not None:
+        if descending:
+            query = query.filter(tuple_(*order_by) < tuple_(*after))
+        else:
+            query = query.filter(tuple_(*order_by) > tuple_(*after))
+    if descending:
+        query = query.order_by(*[column.desc() for column in order_by])
+    else:
+        query = query.order_by(*order_by)
+    if not limit:
+        return query.yield_per(STREAM_BATCH_SIZE), None
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-len(order_by):])
+    return rows, next_cursor
+
+#----------------------------------------------------------------------------#
+# Genres.
+#----------------------------------------------------------------------------#
+
+def has_genre(model, genre):
+    """Filter matching rows of `model` whose genres include `genre`.
+
+    On PostgreSQL this is an array containment answered by the GIN index
+    on genres; elsewhere it matches the quoted name in the JSON text.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return type_coerce(model.genres, postgresql.ARRAY(Text)).contains([genre])
+    pattern = '%' + re.sub(r'([\\%_])', r'\\\1', json.dumps(genre)) + '%'
+    return type_coerce(model.genres, Text).like(pattern, escape='\\')
+
+#----------------------------------------------------------------------------#
+# Upcoming show counts.
+#----------------------------------------------------------------------------#
+
+def _summary(key):
+    """Return (summary model, entity model) for Show.venue_id or Show.artist_id."""
+    if key is Show.venue_id:
+        return VenueShowSummary, Venue
+    return ArtistShowSummary, Artist
+
+
+def count_shows(key, ids, now=None):
+    """Return {id: (upcoming count, next show time, total count)} from the show table.
+
+    `key` is Show.venue_id or Show.artist_id. All counts come from one
+    grouped statement; ids without shows map to (0, None, 0).
+    """
+    counts = dict.fromkeys(ids, (0, None, 0))
+    if not counts:
+        return counts
+    now = now or datetime.now()
+    upcoming = case([(Show.startTime > now, Show.startTime)])
+    rows = db.session.query(
+        key, func.count(upcoming), func.min(upcoming), func.count(Show.id)
+    ).filter(
+        key.in_(counts)
+    ).group_by(
+        key
+    )
+    counts.update((id, (upcoming_count, next_show_time, total))
+                  for id, upcoming_count, next_show_time, total in rows)
+    return counts
+
+
+def upcoming_show_counts(key, ids, now=None):
+    """Return {id: number of upcoming shows} for the given ids.
+
+    `key` is Show.venue_id or Show.artist_id. Counts are read from the
+    summary table by primary key; ids missing from it, or whose next show
+    has started since their row was written, are counted from the show
+    table with one grouped statement.
+    """
+    counts = dict.fromkeys(ids)
+    if not counts:
+        return counts
+    now = now or datetime.now()
+    summary, _ = _summary(key)
+    rows = db.session.query(
+        summary.id, summary.upcoming_count
+    ).filter(
+        summary.id.in_(counts),
+        or_(summary.next_show_time == None, summary.next_show_time > now)
+    )
+    counts.update(rows)
+    stale = [id for id, count in counts.items() if count is None]
+    for id, (upcoming, _, _) in count_shows(key, stale, now).items():
+        counts[id] = upcoming
+    return counts
+
+
+def with_upcoming_show_counts(rows, key, now=None):
+    """Yield (row, upcoming show count) for rows having an `id`.
+
+    Counts are fetched with one grouped query per STREAM_BATCH_SIZE rows, so
+    streamed listings never hold more than one batch in memory.
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, STREAM_BATCH_SIZE))
+        if not batch:
+            return
+        counts = upcoming_show_counts(key, [row.id for row in batch], now)
+        for row in batch:
+            yield row, counts[row.id]
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+def venue_areas(after=None, limit=50, now=None, genre=None):
+    """Return (areas, next_cursor) for one page of the /venues listing.
+
+    Venues are ordered by area, then name, and pages are keyed on
+    (city, state, lower(name), id) so every area stays contiguous. The
+    upcoming show counts of the whole page come from one grouped query.
+    Areas are generated lazily as the rows are read. `genre` keeps only
+    the venues of that genre.
+    """
+    after = decode_cursor(after, str, str, str, int)
+    sort_name = func.lower(Venue.name)
+    query = db.session.query(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.updated_at,
+        sort_name.label('sort_name'),
+        Venue.id.label('sort_id')
+    )
+    if genre:
+        query = query.filter(has_genre(Venue, genre))
+    rows, next_cursor = keyset_page(
+        query, (Venue.city, Venue.state, sort_name, Venue.id), after, limit)
+    rows = with_upcoming_show_counts(rows, Show.venue_id, now)
+    areas = ({
+        "city": city,
+        "state": state,
+        "venues": [{
+            "id": venue.id,
+            "name": venue.name,
+            "updated_at": venue.updated_at,
+            "num_upcoming_shows": count
+        } for venue, count in venues]
+    } for (city, state), venues in groupby(rows, key=lambda item: (item[0].city, item[0].state)))
+    return areas, next_cursor
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+def artist_page(after=None, limit=50, genre=None):
+    """Return (artists, next_cursor) for one page of the /artists listing.
+
+    Artists are generated lazily as the rows are read. `genre` keeps only
+    the artists of that genre.
+    """
+    after = decode_cursor(after, str, int)
+    sort_name = func.lower(Artist.name)
+    query = db.session.query(
+        Artist.id,
+        Artist.name,
+        Artist.updated_at,
+        sort_name.label('sort_name'),
+        Artist.id.label('sort_id')
+    )
+    if genre:
+        query = query.filter(has_genre(Artist, genre))
+    rows, next_cursor = keyset_page(query, (sort_name, Artist.id), after, limit)
+    return ({
+        "id": row.id,
+        "name": row.name,
+        "updated_at": row.updated_at
+    } for row in rows), next_cursor
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+def show_page(after=None, limit=50):
+    """Return (shows, next_cursor) for one page of the /shows listing.
+
+    Venue and artist columns are joined into the same statement rather than
+    loaded per show. Shows are generated lazily as the rows are read.
+    """
+    after = decode_cursor(after, datetime.fromisoformat, int)
+    query = db.session.query(
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Venue.updated_at.label('venue_updated_at'),
+        Artist.updated_at.label('artist_updated_at'),
+        Show.startTime,
+        Show.id
+    ).join(
+        Venue, Venue.id == Show.venue_id
+    ).join(
+        Artist, Artist.id == Show.artist_id
+    )
+    rows, next_cursor = keyset_page(query, (Show.startTime, Show.id), after, limit)
+    return ({
+        "id": row.id,
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "artist_image_link": row.artist_image_link,
+        "start_time": row.startTime,
+        "updated_at": max(row.venue_updated_at, row.artist_updated_at)
+    } for row in rows), next_cursor
+
+#----------------------------------------------------------------------------#
+# Detail pages.
+#----------------------------------------------------------------------------#
+
+def show_counts(key, id, now=None):
+    """Return (upcoming, past) show counts of one venue or artist.
+
+    `key` is Show.venue_id or Show.artist_id; both counts come from a single
+    aggregate over the matching shows.
+    """
+    now = now or datetime.now()
+    upcoming, total = db.session.query(
+        func.count(case([(Show.startTime > now, Show.id)])),
+        func.count(Show.id)
+    ).filter(key == id).one()
+    return upcoming, total - upcoming
+
+
+def _upcoming_shows(shows_query, key, id, now, limit):
+    """Return the soonest `limit` upcoming shows of a detail page.
+
+    `shows_query` builds a query selecting the columns of the other side of
+    the show, ending with Show.startTime, Show.id.
+    """
+    return shows_query().filter(
+        key == id, Show.startTime > now
+    ).order_by(
+        Show.startTime, Show.id
+    ).limit(limit).all()
+
+
+def _past_shows(shows_query, key, id, now, limit, past_after=None):
+    """Return (rows, next_cursor) of the most recent `limit` past shows before `past_after`."""
+    return keyset_page(
+        shows_query().filter(key == id, Show.startTime <= now),
+        (Show.startTime, Show.id),
+        decode_cursor(past_after, datetime.fromisoformat, int),
+        limit,
+        descending=True)
+
+
+def _detail(entity, shows_query, key, id, now, limit, past_after):
+    """Load the entity, its upcoming and past shows and its show counts.
+
+    The four queries are independent and run side by side on the
+    query_executor.
+    """
+    return query_executor.gather(
+        entity,
+        lambda: _upcoming_shows(shows_query, key, id, now, limit),
+        lambda: _past_shows(shows_query, key, id, now, limit, past_after),
+        lambda: show_counts(key, id, now))
+
+
+def venue_detail(venue_id, limit=12, past_after=None, now=None):
+    """Return the data of the /venues/<id> page, or None if there is no such venue.
+
+    Only the shows displayed are loaded; `past_after` continues the past
+    shows from the `past_shows_next` cursor of a previous call.
+    """
+    now = now or datetime.now()
+
+    def shows_query():
+        return db.session.query(
+            Artist.id.label('artist_id'),
+            Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'),
+            Artist.updated_at.label('artist_updated_at'),
+            Show.startTime,
+            Show.id
+        ).join(
+            Artist, Artist.id == Show.artist_id
+        )
+
+    venue, upcoming, (past, past_next), (upcoming_count, past_count) = _detail(
+        lambda: Venue.query.options(noload(Venue.shows)).get(venue_id),
+        shows_query, Show.venue_id, venue_id, now, limit, past_after)
+    if venue is None:
+        return None
+
+    def show_data(row):
+        return {
+            "artist_id": row.artist_id,
+            "artist_name": row.artist_name,
+            "artist_image_link": row.artist_image_link,
+            "start_time": row.startTime,
+            "show_id": row.id,
+            "updated_at": row.artist_updated_at
+        }
+
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": [show_data(row) for row in past],
+        "upcoming_shows": [show_data(row) for row in upcoming],
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+        "past_shows_next": past_next
+    }
+
+
+def artist_detail(artist_id, limit=12, past_after=None, now=None):
+    """Return the data of the /artists/<id> page, or None if there is no such artist.
+
+    Only the shows displayed are loaded; `past_after` continues the past
+    shows from the `past_shows_next` cursor of a previous call.
+    """
+    now = now or datetime.now()
+
+    def shows_query():
+        return db.session.query(
+            Venue.id.label('venue_id'),
+            Venue.name.label('venue_name'),
+            Venue.image_link.label('venue_image_link'),
+            Venue.updated_at.label('venue_updated_at'),
+            Show.startTime,
+            Show.id
+        ).join(
+            Venue, Venue.id == Show.venue_id
+        )
+
+    artist, upcoming, (past, past_next), (upcoming_count, past_count) = _detail(
+        lambda: Artist.query.options(noload(Artist.shows)).get(artist_id),
+        shows_query, Show.artist_id, artist_id, now, limit, past_after)
+    if artist is None:
+        return None
+
+    def show_data(row):
+        return {
+            "venue_id": row.venue_id,
+            "venue_name": row.venue_name,
+            "venue_image_link": row.venue_image_link,
+            "start_time": row.startTime,
+            "show_id": row.id,
+            "updated_at": row.venue_updated_at
+        }
+
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": [show_data(row) for row in past],
+        "upcoming_shows": [show_data(row) for row in upcoming],
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+        "past_shows_next": past_next
+    }
+
+
+def venue_artist_ids(venue_id):
+    """Return the ids of the artists with shows at the venue."""
+    rows = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+    return [artist_id for artist_id, in rows]
+
+
+def artist_venue_ids(artist_id):
+    """Return the ids of the venues where the artist has shows."""
+    rows = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+    return [venue_id for venue_id, in rows]
+
+#----------------------------------------------------------------------------#
+# Page versions.
+#----------------------------------------------------------------------------#
+
+def touch(model, ids):
+    """Bump updated_at of the given rows, which changes their page version."""
+    ids = list(ids)
+    if ids:
+        model.query.filter(model.id.in_(ids)).update(
+            {model.updated_at: datetime.utcnow()}, synchronize_session=False)
+
+
+def _scalars(*queries):
+    """Run single-value queries as one statement of scalar subqueries."""
+    return db.session.query(*[query.as_scalar() for query in queries]).one()
+
+
+def _utc(local_time):
+    # Show times are local; Last-Modified and updated_at are UTC.
+    return local_time and local_time.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _latest(*times):
+    return max(filter(None, times), default=None)
+
+# Every part of a version is an index seek or a primary key lookup, so
+# validating a page costs the same however many rows there are. Inserts
+# move max(id), edits max(updated_at) (shows touch their venue and
+# artist), deletions the Deletion rows, and the passing of time the next
+# and last show start times around `now`.
+
+def _deletions():
+    return (db.session.query(func.sum(Deletion.count)),
+            db.session.query(func.max(Deletion.deleted_at)))
+
+
+def _show_times(now, *criteria):
+    """Queries of the first show after `now` and the last one before it."""
+    return (db.session.query(func.min(Show.startTime)).filter(Show.startTime > now, *criteria),
+            db.session.query(func.max(Show.startTime)).filter(Show.startTime <= now, *criteria))
+
+
+def venues_version(now=None):
+    """Version of the /venues listing: venue edits plus upcoming shows."""
+    now = now or datetime.now()
+    updated_at, last_venue, last_show_id, deletions, deleted_at, next_show, last_show = _scalars(
+        db.session.query(func.max(Venue.updated_at)),
+        db.session.query(func.max(Venue.id)),
+        db.session.query(func.max(Show.id)),
+        *_deletions(),
+        *_show_times(now))
+    return (_latest(updated_at, deleted_at, _utc(last_show)),
+            last_venue, last_show_id, deletions, next_show)
+
+
+def artists_version():
+    """Version of the /artists listing."""
+    updated_at, last_artist, deletions, deleted_at = _scalars(
+        db.session.query(func.max(Artist.updated_at)),
+        db.session.query(func.max(Artist.id)),
+        *_deletions())
+    return _latest(updated_at, deleted_at), last_artist, deletions
+
+
+def shows_version():
+    """Version of the /shows listing, which also shows venue and artist names."""
+    venues_updated_at, artists_updated_at, last_show, deletions, deleted_at = _scalars(
+        db.session.query(func.max(Venue.updated_at)),
+        db.session.query(func.max(Artist.updated_at)),
+        db.session.query(func.max(Show.id)),
+        *_deletions())
+    return _latest(venues_updated_at, artists_updated_at, deleted_at), last_show, deletions
+
+
+def _detail_version(model, key, id, now):
+    # The shows of the page were added or deleted along with an update of
+    # the entity's updated_at (see record_show callers and _delete).
+    next_show, last_show = _show_times(now, key == id)
+    row = db.session.query(
+        model.updated_at, next_show.as_scalar(), last_show.as_scalar()
+    ).filter(
+        model.id == id
+    ).first()
+    if row is None:
+        return None
+    updated_at, next_show, last_show = row
+    return _latest(updated_at, _utc(last_show)), updated_at, next_show
+
+
+def venue_version(venue_id, now=None):
+    """Version of /venues/<id>, or None if there is no such venue."""
+    return _detail_version(Venue, Show.venue_id, venue_id, now or datetime.now())
+
+
+def artist_version(artist_id, now=None):
+    """Version of /artists/<id>, or None if there is no such artist."""
+    return _detail_version(Artist, Show.artist_id, artist_id, now or datetime.now())
+
+#----------------------------------------------------------------------------#
+# Deletion.
+#----------------------------------------------------------------------------#
+
+def _delete(model, key, other_key, other_model, ids):
+    ids = list(ids)
+    if not ids:
+        return 0, []
+    related = [id for id, in db.session.query(other_key).filter(key.in_(ids)).distinct()]
+    touch(other_model, related)
+    record_deletion(model)
+    forget_show_summaries(other_key, related)
+    forget_show_summaries(key, ids)
+    Show.query.filter(key.in_(ids)).delete(synchronize_session=False)
+    deleted = model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+    return deleted, related
+
+
+def record_deletion(model):
+    """Count a deletion of venues or artists in their Deletion row."""
+    now = datetime.utcnow()
+    updated = Deletion.query.filter(Deletion.name == model.__tablename__).update(
+        {Deletion.count: Deletion.count + 1, Deletion.deleted_at: now}, synchronize_session=False)
+    if not updated:
+        db.session.add(Deletion(name=model.__tablename__, count=1, deleted_at=now))
+
+
+def delete_venues(venue_ids):
+    """Delete venues and their shows in the current transaction.
+
+    One DELETE per table, however many shows there are. Returns (number of
+    venues deleted, ids of the artists that had shows there).
+    """
+    return _delete(Venue, Show.venue_id, Show.artist_id, Artist, venue_ids)
+
+
+def delete_artists(artist_ids):
+    """Delete artists and their shows in the current transaction.
+
+    Returns (number of artists deleted, ids of the venues they played at).
+    """
+    return _delete(Artist, Show.artist_id, Show.venue_id, Venue, artist_ids)
+
+#----------------------------------------------------------------------------#
+# Show summaries.
+#----------------------------------------------------------------------------#
+
+def record_show(venue_id, artist_id, start_time, now=None):
+    """Count a new show in the summaries of its venue and artist.
+
+    Entities without a summary row are left to the refresh; their counts
+    come from the show table until then.
+    """
+    now = now or datetime.now()
+    upcoming = start_time > now
+    for summary, id in ((VenueShowSummary, venue_id), (ArtistShowSummary, artist_id)):
+        values = {summary.total_count: summary.total_count + 1}
+        if upcoming:
+            values[summary.upcoming_count] = summary.upcoming_count + 1
+            values[summary.next_show_time] = case(
+                [(or_(summary.next_show_time == None, summary.next_show_time > start_time), start_time)],
+                else_=summary.next_show_time)
+        summary.query.filter(summary.id == id).update(values, synchronize_session=False)
+
+
+def forget_show_summaries(key, ids):
+    """Drop the summaries of the given venues or artists, e.g. after a bulk change of their shows."""
+    ids = list(ids)
+    if ids:
+        summary, _ = _summary(key)
+        summary.query.filter(summary.id.in_(ids)).delete(synchronize_session=False)
+
+
+def refresh_show_summaries(key, now=None, everything=False):
+    """Recompute the stale and missing summaries of all venues or artists.
+
+    With `everything` every row is recomputed. Returns the number of
+    summaries written; each STREAM_BATCH_SIZE of them is committed on its
+    own.
+    """
+    now = now or datetime.now()
+    summary, model = _summary(key)
+    query = db.session.query(model.id).outerjoin(summary, summary.id == model.id)
+    if not everything:
+        query = query.filter(or_(summary.id == None, summary.next_show_time <= now))
+    written = 0
+    after = None
+    while True:
+        rows, _ = keyset_page(query, (model.id,), after, STREAM_BATCH_SIZE)
+        if not rows:
+            return written
+        after = (rows[-1].id,)
+        counts = count_shows(key, [row.id for row in rows], now)
+        summary.query.filter(summary.id.in_(counts)).delete(synchronize_session=False)
+        db.session.execute(summary.__table__.insert(), [{
+            "id": id,
+            "upcoming_count": upcoming,
+            "next_show_time": next_show_time,
+            "total_count": total
+        } for id, (upcoming, next_show_time, total) in counts.items()])
+        db.session.commit()
+        written += len(counts)
+
+#----------------------------------------------------------------------------#
+# Bookings.
+#----------------------------------------------------------------------------#
+
+def _bookings(criterion, start=None, end=None):
+    """Return the shows matching `criterion` that overlap [start, end), by start time.
+
+    No show lasts longer than SHOW_MAX_DURATION, so only the shows starting
+    within that much before `start` can overlap it, which keeps the lookup
+    a range scan of the (venue_id, startTime) and (artist_id, startTime)
+    indexes. Shows of length 0 overlap nothing.
+    """
+    query = db.session.query(
+        Show.id, Show.venue_id, Show.artist_id, Show.startTime, Show.duration
+    ).filter(criterion, Show.duration > 0)
+    if end is not None:
+        query = query.filter(Show.startTime < end)
+    if start is not None:
+        query = query.filter(Show.startTime > start - timedelta(minutes=config.SHOW_MAX_DURATION))
+    rows = query.order_by(Show.startTime, Show.id).all()
+    if start is None:
+        return rows
+    return [row for row in rows if booking(row.startTime, row.duration).end > start]
+
+
+def bookings(key, ids, start=None, end=None):
+    """Return the shows of the venues or artists `ids` overlapping [start, end).
+
+    `key` is Show.venue_id or Show.artist_id; either bound may be omitted.
+    """
+    return _bookings(key.in_(list(ids)), start, end)
+
+
+def show_conflicts(venue_id, artist_id, start_time, duration):
+    """Return the shows a new show would overlap at its venue or with its artist."""
+    if duration <= 0:
+        return []
+    return _bookings(
+        or_(Show.venue_id == venue_id, Show.artist_id == artist_id),
+        start_time, booking(start_time, duration).end)
+
+
+def is_double_booking(error):
+    """Whether an IntegrityError was raised by the show exclusion constraints."""
+    # SQLSTATE 23P01, exclusion_violation; other databases have no such constraint.
+    return getattr(error.orig, 'pgcode', None) == '23P01'
@@ -0,0 +1,135 @@
+import re
+from bisect import bisect_left
+from collections import namedtuple
+from heapq import nsmallest
+
+from sqlalchemy import event, func, literal_column, or_
+
+from models import db, Artist, Venue, DOCUMENT_SQL
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+# Columns covered by the search document, in both backends.
+SEARCH_FIELDS = ('name', 'city', 'state', 'genres')
+
+# A hit on the name outranks a hit on city, state or genres.
+NAME_WEIGHT = 2
+
+SearchResult = namedtuple('SearchResult', 'id name')
+
+
+def tokenize(text):
+    if isinstance(text, list):
+        text = ' '.join(text)
+    return re.findall(r'\w+', (text or '').lower())
+
+
+class InvertedIndex:
+    """In-process token index used when the database is not PostgreSQL.
+
+    Tokens are kept sorted so every query term is matched as a prefix with a
+    binary search, and postings carry a per-field weight used for ranking.
+    """
+
+    def __init__(self, rows):
+        self._postings = {}
+        self._names = {}
+        for row in rows:
+            self._names[row.id] = row.name
+            for field in SEARCH_FIELDS:
+                weight = NAME_WEIGHT if field == 'name' else 1
+                for token in tokenize(getattr(row, field)):
+                    posting = self._postings.setdefault(token, {})
+                    posting[row.id] = max(posting.get(row.id, 0), weight)
+        self._tokens = sorted(self._postings)
+
+    def _prefix_scores(self, prefix):
+        scores = {}
+        for i in range(bisect_left(self._tokens, prefix), len(self._tokens)):
+            token = self._tokens[i]
+            if not token.startswith(prefix):
+                break
+            # Whole-word matches rank above prefix-only matches.
+            bonus = 1 if token == prefix else 0
+            for id, weight in self._postings[token].items():
+                scores[id] = max(scores.get(id, 0), weight + bonus)
+        return scores
+
+    def _sort_key(self, id):
+        return ((self._names[id] or '').lower(), id)
+
+    def search(self, term, limit):
+        """Return ([SearchResult], total) for rows matching every term token."""
+        tokens = tokenize(term)
+        if not tokens:
+            ids = nsmallest(limit, self._names, key=self._sort_key)
+            return [SearchResult(id, self._names[id]) for id in ids], len(self._names)
+
+        scores = None
+        for token in tokens:
+            matches = self._prefix_scores(token)
+            if scores is not None:
+                matches = {id: scores[id] + weight
+                           for id, weight in matches.items() if id in scores}
+            scores = matches
+            if not scores:
+                return [], 0
+
+        ids = nsmallest(limit, scores,
+                        key=lambda id: (-scores[id],) + self._sort_key(id))
+        return [SearchResult(id, self._names[id]) for id in ids], len(scores)
+
+
+class Searcher:
+    """Ranked prefix search over SEARCH_FIELDS of one model.
+
+    On PostgreSQL the query runs against the tsvector and trigram indexes;
+    on any other database an InvertedIndex is built on first use and
+    discarded whenever a row of the model is written through the ORM.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._index = None
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, name, self.invalidate)
+
+    def invalidate(self, *args):
+        self._index = None
+
+    def search(self, term, limit):
+        """Return ([SearchResult], total) for the best `limit` matches."""
+        if db.engine.dialect.name == 'postgresql':
+            return self._search_postgres(term, limit)
+        if self._index is None:
+            columns = [getattr(self.model, field) for field in ('id',) + SEARCH_FIELDS]
+            self._index = InvertedIndex(db.session.query(*columns))
+        return self._index.search(term, limit)
+
+    def _search_postgres(self, term, limit):
+        model = self.model
+        query = db.session.query(
+            model.id, model.name, func.count().over().label('total'))
+        order_by = [func.lower(model.name), model.id]
+
+        tokens = tokenize(term)
+        if tokens:
+            document = literal_column(DOCUMENT_SQL.format(table=model.__tablename__))
+            ts_query = func.to_tsquery(
+                'simple', ' & '.join(token + ':*' for token in tokens))
+            pattern = '%' + re.sub(r'([\\%_])', r'\\\1', term.strip()) + '%'
+            query = query.filter(or_(
+                document.op('@@')(ts_query),
+                model.name.ilike(pattern, escape='\\')
+            ))
+            rank = func.ts_rank(document, ts_query) + func.similarity(model.name, term)
+            order_by.insert(0, rank.desc())
+
+        rows = query.order_by(*order_by).limit(limit).all()
+        return [SearchResult(row.id, row.name) for row in rows], rows[0].total if rows else 0
+
+
+venue_search = Searcher(Venue)
+artist_search = Searcher(Artist)
@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+import tempfile
+
+# The app reads its configuration when it is imported. Tests never use
+# DATABASE_URL: they run on TEST_DATABASE_URL, which they drop and
+# reseed, or on a throwaway SQLite file.
+os.environ['DATABASE_URL'] = os.environ.get(
+    'TEST_DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fyyur-test.db'))
+os.environ['QUERY_PROFILER'] = '1'
+os.environ['CACHE_TYPE'] = 'null'
+os.environ['DETAIL_QUERY_WORKERS'] = '0'
+os.environ['TEMPLATE_CACHE'] = '0'
+os.environ['TEMPLATE_WARMUP'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import benchmark
+from app import app as fyyur_app
+
+
+@pytest.fixture(scope='session')
+def app():
+    fyyur_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, FRAGMENT_CACHE=False)
+    with fyyur_app.app_context():
+        yield fyyur_app
+
+
+@pytest.fixture(scope='session')
+def seed(app):
+    """Recreate the database with `venues` venues, twice as many artists and `shows` shows."""
+    def seed(venues, shows):
+        benchmark.seed(venues, venues * 2, shows, 0.5, random.Random(0))
+    return seed
@@ -0,0 +1,18 @@
+from app import create_app
+
+
+def _rules(app):
+    return sorted((rule.rule, rule.endpoint) for rule in app.url_map.iter_rules())
+
+
+def test_create_app_registers_every_view(app):
+    other = create_app()
+    assert _rules(other) == _rules(app)
+    other.config.update(TESTING=True)
+    client = other.test_client()
+    home = client.get('/')
+    assert home.status_code == 200
+    assert b'href="/venues"' in home.data
+    missing = client.get('/nowhere')
+    assert missing.status_code == 404
+    assert b'href="/"' in missing.data
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from bookings import BookingIndex, booking, free_periods
+from importer import ShowImporter
+from models import db, Artist, Show, Venue
+from queries import show_conflicts
+
+START = datetime(2040, 5, 1, 20, 0)
+
+
+def at(minutes):
+    return START + timedelta(minutes=minutes)
+
+#----------------------------------------------------------------------------#
+# Index.
+#----------------------------------------------------------------------------#
+
+def test_booking_index_finds_overlapping_bookings_only():
+    index = BookingIndex()
+    first, second = booking(at(0), 60, 1), booking(at(120), 60, 2)
+    index.load('venue', [second, first])
+    assert index.conflicts('venue', at(30), at(150)) == [first, second]
+    assert index.conflicts('venue', at(60), at(120)) == []
+    assert index.conflicts('venue', at(-60), at(0)) == []
+    assert index.conflicts('artist', at(0), at(60)) == []
+
+
+def test_booking_index_add_and_remove():
+    index = BookingIndex()
+    booked = booking(at(0), 90)
+    index.add('venue', booked)
+    index.add('venue', booking(at(200), 0))
+    assert index.conflicts('venue', at(60), at(300)) == [booked]
+    index.remove('venue', booked)
+    assert index.conflicts('venue', at(60), at(300)) == []
+
+
+def test_free_periods_are_the_gaps_between_bookings():
+    bookings = [booking(at(60), 60), booking(at(180), 60)]
+    assert free_periods(bookings, at(0), at(300)) == [
+        (at(0), at(60)), (at(120), at(180)), (at(240), at(300))]
+    assert free_periods(bookings, at(90), at(200)) == [(at(120), at(180))]
+
+#----------------------------------------------------------------------------#
+# Database.
+#----------------------------------------------------------------------------#
+
+@pytest.fixture(scope='module', autouse=True)
+def dataset(seed):
+    seed(20, 200)
+
+
+@pytest.fixture
+def booked(app):
+    """Ids of a new venue, two new artists and of a 2-hour show of the first artist there."""
+    venue = Venue(name='Booked', city='Nowhere', state='CA', address='1 Main Street',
+                  phone='555-0000', genres=['Jazz'])
+    artists = [Artist(name='Booked %d' % i, city='Nowhere', state='CA', phone='555-0001',
+                      genres=['Jazz']) for i in range(2)]
+    db.session.add_all([venue] + artists)
+    db.session.flush()
+    show = Show(venue_id=venue.id, artist_id=artists[0].id, startTime=at(0), duration=120)
+    db.session.add(show)
+    db.session.commit()
+    ids = venue.id, artists[0].id, artists[1].id, show.id
+    db.session.remove()
+    return ids
+
+
+def test_show_conflicts_at_the_venue_and_with_the_artist(booked):
+    venue_id, artist_id, other_artist_id, show_id = booked
+    assert [show.id for show in show_conflicts(venue_id, other_artist_id, at(60), 120)] == [show_id]
+    assert [show.id for show in show_conflicts(-1, artist_id, at(-60), 90)] == [show_id]
+    assert show_conflicts(venue_id, other_artist_id, at(120), 60) == []
+    assert show_conflicts(venue_id, other_artist_id, at(-60), 60) == []
+
+
+def test_overlapping_show_is_rejected(app, booked):
+    venue_id, _, other_artist_id, _ = booked
+    client = app.test_client()
+
+    def post(minutes):
+        return client.post('/shows/create', data={
+            'venue_id': venue_id, 'artist_id': other_artist_id,
+            'start_time': at(minutes).strftime('%Y-%m-%d %H:%M:%S'), 'duration': 60})
+
+    assert b'already booked' in post(90).data
+    assert b'successfully listed' in post(120).data
+    assert Show.query.filter_by(venue_id=venue_id).count() == 2
+
+
+def test_importer_rejects_double_bookings(booked):
+    venue_id, artist_id, other_artist_id, _ = booked
+
+    def row(artist, minutes):
+        return {'venue_id': str(venue_id), 'artist_id': str(artist),
+                'start_time': at(minutes).strftime('%Y-%m-%d %H:%M:%S'), 'duration': '60'}
+
+    report = ShowImporter().run(enumerate([
+        row(other_artist_id, 60),   # over the existing show
+        row(other_artist_id, 180),
+        row(artist_id, 200),        # over the row before
+        row(artist_id, 240),
+    ], start=2))
+    assert (report.inserted, report.rejected) == (2, 2)
+    assert [error['line'] for error in report.errors] == [2, 4]
+    assert set(report.errors[0]['errors']) == {'venue_id'}
@@ -0,0 +1,48 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from cache import LRUCache, cache
+from models import db, Venue
+
+
+@pytest.fixture
+def lru_cache(app, seed):
+    seed(20, 200)
+    backend = cache.backend
+    cache.backend = LRUCache()
+    try:
+        yield cache
+    finally:
+        cache.backend = backend
+
+
+def test_write_of_another_process_is_not_served_from_cache(app, lru_cache):
+    client = app.test_client()
+    assert b'Venue 0' in client.get('/venues/1').data
+    assert b'Venue 0' in client.get('/api/v1/venues/1').data
+    # Committed as another worker would: this process' cache is not told.
+    Venue.query.filter(Venue.id == 1).update({Venue.name: 'Renamed', Venue.updated_at: datetime.utcnow()})
+    db.session.commit()
+    assert b'Renamed' in client.get('/venues/1').data
+    assert b'Renamed' in client.get('/api/v1/venues/1').data
+
+
+def test_show_starting_is_not_served_from_cache(app, lru_cache):
+    client = app.test_client()
+    venue = Venue(name='Quiet', city='Nowhere', state='CA', address='1 Main Street',
+                  phone='555-0000', genres=['Jazz'])
+    db.session.add(venue)
+    db.session.commit()
+    venue_id = venue.id
+    start_time = (datetime.now() + timedelta(seconds=2)).replace(microsecond=0)
+    client.post('/shows/create', data={
+        'venue_id': venue_id, 'artist_id': 1,
+        'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'), 'duration': 60})
+    page = client.get('/venues/%d' % venue_id)
+    assert b'1 Upcoming Show' in page.data
+    time.sleep(max(0, (start_time - datetime.now()).total_seconds()) + 0.1)
+    page = client.get('/venues/%d' % venue_id, headers={'If-None-Match': page.headers['ETag']})
+    assert page.status_code == 200
+    assert b'0 Upcoming Shows' in page.data
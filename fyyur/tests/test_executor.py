@@ -0,0 +1,38 @@
+import pytest
+
+from executor import query_executor
+from models import db, Venue
+from queries import venue_detail
+
+
+@pytest.fixture
+def executor(app, seed):
+    seed(20, 200)
+    workers = app.config['DETAIL_QUERY_WORKERS']
+    app.config['DETAIL_QUERY_WORKERS'] = 4
+    query_executor.init_app(app)
+    try:
+        yield query_executor
+    finally:
+        app.config['DETAIL_QUERY_WORKERS'] = workers
+        query_executor._pool.shutdown()
+        query_executor._pool = None
+
+
+def test_concurrent_detail_matches_serial(app, executor):
+    concurrent = venue_detail(1)
+    executor._pool, pool = None, executor._pool
+    try:
+        serial = venue_detail(1)
+    finally:
+        executor._pool = pool
+    assert concurrent == serial
+
+
+def test_detail_leaves_the_callers_transaction_open(app, executor):
+    db.session.add(Venue(name='Uncommitted', city='Nowhere', state='CA', address='1 Main Street',
+                         phone='555-0000', genres=['Jazz']))
+    db.session.flush()
+    assert venue_detail(1)['id'] == 1
+    db.session.rollback()
+    assert Venue.query.filter_by(name='Uncommitted').count() == 0
@@ -0,0 +1,19 @@
+import csv
+import io
+
+from exporter import EXPORTS, write_csv
+
+
+def test_empty_csv_export_has_its_header(app):
+    columns = EXPORTS['venues']()
+    assert ''.join(write_csv(columns, iter([]))).splitlines() == [
+        ','.join(column.name for column in columns)]
+
+
+def test_resumed_csv_export_past_the_last_id(app, seed):
+    seed(20, 200)
+    client = app.test_client()
+    full = list(csv.reader(io.StringIO(client.get('/api/v1/export/venues?format=csv').get_data(as_text=True))))
+    assert len(full) == 21
+    resumed = client.get('/api/v1/export/venues?format=csv&start_id=1000').get_data(as_text=True)
+    assert list(csv.reader(io.StringIO(resumed))) == [full[0]]
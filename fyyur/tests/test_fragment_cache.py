@@ -0,0 +1,70 @@
+import pytest
+
+from cache import Cache, RedisCache, cache, fragment_cache
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the redis-py calls RedisCache makes, counting them."""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append('get')
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.calls.append('mget')
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.calls.append('set')
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def redis_fragments(app, seed):
+    seed(20, 200)
+    client = FakeRedis()
+    backends = fragment_cache.backend, cache.backend
+    fragment_cache.backend = RedisCache(client, prefix='fyyur:fragment:')
+    cache.backend = RedisCache(client)
+    app.config['FRAGMENT_CACHE'] = True
+    try:
+        yield client
+    finally:
+        fragment_cache.backend, cache.backend = backends
+        app.config['FRAGMENT_CACHE'] = False
+
+
+@pytest.mark.parametrize('path', ['/venues', '/artists', '/shows'])
+def test_listing_fetches_its_cards_in_one_call(app, redis_fragments, path):
+    first = app.test_client().get(path, buffered=True).data
+    redis_fragments.calls.clear()
+    second = app.test_client().get(path, buffered=True).data
+    assert second == first
+    assert redis_fragments.calls == ['mget']
+
+
+def test_fragments_do_not_share_the_page_store(app):
+    pages = Cache(namespace=None)
+    fragments = Cache(namespace='fragment')
+    app.config.update(CACHE_TYPE='lru', FRAGMENT_CACHE_MAXSIZE=2)
+    try:
+        pages.init_app(app)
+        fragments.init_app(app)
+    finally:
+        app.config['CACHE_TYPE'] = 'null'
+        app.extensions['cache'] = cache
+        app.extensions['fragment_cache'] = fragment_cache
+    pages.get_or_set('venue:1', lambda: 'page')
+    for i in range(10):
+        fragments.get_or_set('venue-item:%d' % i, lambda: 'card')
+    assert pages.get_or_set('venue:1', lambda: None) == 'page'
+    assert pages.stats()['hits'] == 1
+    assert fragments.stats()['misses'] == 10
@@ -0,0 +1,76 @@
+import pytest
+
+# Pages whose number of SQL statements must not grow with the data, as
+# (method, path, form). The detail pages use ids present at both sizes.
+ROUTES = [
+    ('GET', '/venues', None),
+    ('GET', '/artists', None),
+    ('GET', '/shows', None),
+    ('GET', '/venues/1', None),
+    ('GET', '/artists/1', None),
+    ('POST', '/venues/search', {'search_term': 'venue'}),
+    ('POST', '/artists/search', {'search_term': 'artist'}),
+    ('GET', '/api/v1/venues', None),
+    ('GET', '/api/v1/artists', None),
+    ('GET', '/api/v1/shows', None),
+    ('GET', '/api/v1/venues/1', None),
+    ('GET', '/api/v1/artists/1', None),
+    ('GET', '/api/v1/venues/search?q=venue', None),
+    ('GET', '/api/v1/artists/search?q=artist', None),
+]
+
+N = 20
+
+
+def query_counts(client):
+    counts = {}
+    for method, path, form in ROUTES:
+        response = client.open(path, method=method, data=form)
+        assert response.status_code == 200, path
+        counts[path] = int(response.headers['X-DB-Query-Count'])
+    return counts
+
+
+@pytest.fixture(scope='module')
+def counts(app, seed):
+    # Streamed listings send their headers before the rows are read, so
+    # X-DB-Query-Count would only cover the statements run until then.
+    stream_listings = app.config['STREAM_LISTINGS']
+    app.config['STREAM_LISTINGS'] = False
+    try:
+        seed(N, N * 10)
+        small = query_counts(app.test_client())
+        seed(N * 10, N * 100)
+        large = query_counts(app.test_client())
+    finally:
+        app.config['STREAM_LISTINGS'] = stream_listings
+    return small, large
+
+
+@pytest.mark.parametrize('path', [route[1] for route in ROUTES])
+def test_query_count_does_not_grow_with_data(counts, path):
+    small, large = counts
+    assert large[path] == small[path]
+
+
+def streamed_query_count(app, path):
+    """Return the statements run by a streamed page, once its whole body is sent."""
+    from profiler import profiler
+    response = app.test_client().get(path, buffered=True)
+    assert response.status_code == 200, path
+    return profiler.recent[0]['count']
+
+
+def test_full_venue_listing_query_count_does_not_grow_with_data(app, seed):
+    # Every venue, in one streamed page read from a server-side cursor:
+    # each area and venue row added must not cost a statement of its own.
+    page_size = app.config['LISTING_PAGE_SIZE']
+    app.config['LISTING_PAGE_SIZE'] = 0
+    try:
+        seed(N, N * 10)
+        small = streamed_query_count(app, '/venues')
+        seed(N * 10, N * 100)
+        large = streamed_query_count(app, '/venues')
+    finally:
+        app.config['LISTING_PAGE_SIZE'] = page_size
+    assert large == small
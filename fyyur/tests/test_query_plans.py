@@ -0,0 +1,90 @@
+import re
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import db, Show
+from queries import (
+    artist_detail,
+    artist_page,
+    count_shows,
+    show_page,
+    venue_areas,
+    venue_detail,
+    venues_version
+)
+
+# The hot queries and the index each must be answered from (migrations
+# 17f8ed12a646 and 8c4d2e61b7a9).
+HOT_QUERIES = [
+    ('venue listing', lambda: venue_areas(limit=20), 'ix_venue_city_state_name'),
+    ('artist listing', lambda: artist_page(limit=20), 'ix_artist_lower_name'),
+    ('show listing', lambda: show_page(limit=20), 'ix_show_startTime'),
+    ('venue show counts', lambda: count_shows(Show.venue_id, [1, 2, 3]), 'ix_show_venue_id_startTime'),
+    ('artist show counts', lambda: count_shows(Show.artist_id, [1, 2, 3]), 'ix_show_artist_id_startTime'),
+    ('venue detail', lambda: venue_detail(1), 'ix_show_venue_id_startTime'),
+    ('artist detail', lambda: artist_detail(1), 'ix_show_artist_id_startTime'),
+    ('listing version', lambda: venues_version(), 'ix_show_startTime'),
+]
+
+# Plan lines reading a whole table, on SQLite and on PostgreSQL.
+FULL_SCAN = re.compile(r'^SCAN (show|venue|artist)$|Seq Scan on (show|venue|artist)\b')
+
+
+@pytest.fixture(scope='module', autouse=True)
+def dataset(seed):
+    seed(100, 5000)
+
+
+def statements(call):
+    """Call `call` and return the (statement, parameters) it executed."""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append((statement, parameters))
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        call()
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+    return seen
+
+
+def plan(statement, parameters):
+    """Return the lines of the query plan of a statement."""
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if db.engine.dialect.name == 'postgresql':
+            # The test tables are small enough for sequential scans to win;
+            # what matters is that an index can serve the query.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + statement, parameters)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+        return [str(row[-1]).strip() for row in cursor.fetchall()]
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+@pytest.mark.parametrize('name, call, index', HOT_QUERIES, ids=[query[0] for query in HOT_QUERIES])
+def test_hot_query_uses_index(name, call, index):
+    plans = [plan(statement, parameters) for statement, parameters in statements(call)]
+    lines = [line for lines in plans for line in lines]
+    assert any(index in line for line in lines), '\n'.join(lines)
+    assert not [line for line in lines if FULL_SCAN.search(line)], '\n'.join(lines)
+
+
+@pytest.mark.parametrize('searcher, table', [('venue_search', 'venue'), ('artist_search', 'artist')])
+def test_search_uses_index(searcher, table):
+    import search
+    if db.engine.dialect.name != 'postgresql':
+        pytest.skip('searched in process on other databases')
+    call = lambda: getattr(search, searcher).search('venue artist', 20)
+    plans = [plan(statement, parameters) for statement, parameters in statements(call)]
+    lines = [line for lines in plans for line in lines]
+    assert any('ix_%s_search_document' % table in line for line in lines), '\n'.join(lines)
+    assert any('ix_%s_name_trgm' % table in line for line in lines), '\n'.join(lines)